@@ -0,0 +1,260 @@
+"""
+Shared file-pair diff service for fileDiffViewer and folderDiffViewer.
+
+Diff results are cached on disk, keyed by the SHA-256 digests of both files' contents and the
+diff options, so re-diffing an unchanged dev/prod pair loads the stored result instead of
+running difflib again. Files that cannot be decoded are cached as such, so they are not read
+again either. The cache is bounded in size and evicts the least recently used results first.
+Pairs that are not cached are diffed in parallel worker processes when there is enough work
+to pay for starting them, and in-process otherwise.
+
+The viewers' HTML templates are rendered through one Jinja environment whose compiled
+templates are kept as bytecode on disk, so later runs skip parsing and compiling them.
+jinja2, multiprocessing and tempfile are imported only on the paths that use them.
+
+Environment:
+    DIFF_CACHE_DIR        Cache directory (default: ~/.cache/script_tools_diff).
+    DIFF_CACHE_MAX_MB     Cache size bound in megabytes (default: 256).
+    DIFF_PARALLEL_MIN_MB  Uncached input size from which worker processes are used (default: 2).
+    TEMPLATE_CACHE_DIR    Template bytecode directory (default: ~/.cache/script_tools_templates).
+"""
+
+import difflib
+import hashlib
+import json
+import locale
+import os
+
+DEFAULT_CACHE_DIR = os.environ.get('DIFF_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'script_tools_diff'))
+DEFAULT_CACHE_MAX_BYTES = int(float(os.environ.get('DIFF_CACHE_MAX_MB', 256)) * 1024 * 1024)
+# Below this many bytes of uncached files, starting worker processes costs more than difflib
+PARALLEL_MIN_BYTES = int(float(os.environ.get('DIFF_PARALLEL_MIN_MB', 2)) * 1024 * 1024)
+
+TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'script_tools_templates'))
+
+# Bump when the stored result format changes so old entries are ignored
+CACHE_FORMAT = 1
+
+_template_environment = None
+_template_sources = {}
+
+
+def render_template(name, source, **context):
+    """
+    Renders `source` registered under `name`. The template is compiled once per process and
+    its bytecode is cached in TEMPLATE_CACHE_DIR; Jinja recompiles it if `source` changes.
+    """
+    global _template_environment
+    if _template_environment is None:
+        from jinja2 import Environment, FileSystemBytecodeCache, FunctionLoader
+
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        _template_environment = Environment(
+            loader=FunctionLoader(lambda template_name: _template_sources.get(template_name)),
+            bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+        )
+    _template_sources[name] = source
+    return _template_environment.get_template(name).render(**context)
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def diff_options(encoding=None):
+    """The options that change a diff result, as stored in its cache key."""
+    return {
+        'format': CACHE_FORMAT,
+        'algorithm': 'difflib.Differ',
+        'encoding': encoding or locale.getpreferredencoding(False),
+    }
+
+
+def compute_diff(lines1, lines2):
+    """Returns the `difflib.Differ` comparison of two lists of lines."""
+    return list(difflib.Differ().compare(lines1, lines2))
+
+
+class CachedDecodeError(UnicodeDecodeError):
+    """A `UnicodeDecodeError` loaded from the diff cache; `str()` gives the original message."""
+    def __init__(self, encoding, reason, message):
+        super().__init__(encoding, b'', 0, 0, reason)
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def _to_cache_entry(outcome):
+    """Returns the cacheable form of a diff outcome, or None if it should not be cached."""
+    if isinstance(outcome, UnicodeDecodeError):
+        return {'error': 'decode', 'encoding': outcome.encoding, 'reason': outcome.reason, 'message': str(outcome)}
+    if isinstance(outcome, Exception):
+        # Other errors (missing files, permissions) may be transient
+        return None
+    return outcome
+
+
+def _from_cache_entry(entry):
+    if isinstance(entry, dict) and entry.get('error') == 'decode':
+        return CachedDecodeError(entry['encoding'], entry['reason'], entry['message'])
+    return entry
+
+
+def has_differences(diff):
+    return any(line.startswith('- ') or line.startswith('+ ') for line in diff)
+
+
+def _diff_paths(path1, path2, encoding):
+    with open(path1, 'r', encoding=encoding) as file1, open(path2, 'r', encoding=encoding) as file2:
+        return compute_diff(file1.readlines(), file2.readlines())
+
+
+class DiffCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        """
+        On-disk cache of diff results, one JSON file per result, bounded to `max_bytes`.
+
+        A hit refreshes the file's modification time, and `prune` removes the files with the
+        oldest modification times first, which makes the bound least-recently-used.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(digest1, digest2, options):
+        payload = json.dumps({'a': digest1, 'b': digest2, 'options': options}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                diff = json.load(cache_file)
+            os.utime(path)
+            return diff
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, diff):
+        import tempfile
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as cache_file:
+            json.dump(diff, cache_file)
+        os.replace(tmp_path, self._path(key))
+
+    def prune(self):
+        """Deletes the least recently used results until the cache fits in `max_bytes`."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def diff_file_pairs(pairs, cache=None, encoding=None, workers=None, parallel_min_bytes=PARALLEL_MIN_BYTES):
+    """
+    Diffs many (path1, path2) pairs, serving unchanged pairs from the cache and diffing the
+    rest, in parallel processes if they hold at least `parallel_min_bytes`.
+
+    Args:
+        pairs (list): (path1, path2) tuples.
+        cache (DiffCache): Cache to use; a default one is created if omitted.
+        encoding (str): Encoding used to read the files (default: the locale's).
+        workers (int): Maximum worker processes for uncached pairs (default: CPU count).
+        parallel_min_bytes (int): Total size of the uncached files from which worker
+            processes are used.
+
+    Returns:
+        dict: {(path1, path2): list of Differ lines (empty for identical files), or the
+            exception raised while reading or diffing that pair}. Decode errors may be a
+            `CachedDecodeError`.
+    """
+    cache = cache or DiffCache()
+    options = diff_options(encoding)
+    results = {}
+    missing = {}
+    missing_bytes = 0
+    for pair in pairs:
+        try:
+            digest1, digest2 = file_digest(pair[0]), file_digest(pair[1])
+        except OSError as err:
+            results[pair] = err
+            continue
+        if digest1 == digest2:
+            # Identical contents: nothing to read, diff or cache
+            results[pair] = []
+            continue
+        key = cache.key(digest1, digest2, options)
+        diff = cache.get(key)
+        if diff is None:
+            missing[pair] = key
+            missing_bytes += os.path.getsize(pair[0]) + os.path.getsize(pair[1])
+        else:
+            results[pair] = _from_cache_entry(diff)
+
+    if len(missing) > 1 and missing_bytes >= parallel_min_bytes:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(missing))) as executor:
+            futures = {pair: executor.submit(_diff_paths, pair[0], pair[1], options['encoding']) for pair in missing}
+        outcomes = {}
+        for pair, future in futures.items():
+            try:
+                outcomes[pair] = future.result()
+            except Exception as err:
+                outcomes[pair] = err
+    else:
+        outcomes = {}
+        for pair in missing:
+            try:
+                outcomes[pair] = _diff_paths(pair[0], pair[1], options['encoding'])
+            except Exception as err:
+                outcomes[pair] = err
+
+    for pair, outcome in outcomes.items():
+        entry = _to_cache_entry(outcome)
+        if entry is not None:
+            cache.put(missing[pair], entry)
+        results[pair] = outcome
+    if outcomes:
+        cache.prune()
+    return results
+
+
+def diff_files(path1, path2, cache=None, encoding=None):
+    """
+    Diffs two files, using the cached result when both files are unchanged.
+
+    Returns:
+        list: The `difflib.Differ` lines.
+
+    Raises:
+        OSError, UnicodeDecodeError: If either file cannot be read.
+    """
+    result = diff_file_pairs([(path1, path2)], cache, encoding)[(path1, path2)]
+    if isinstance(result, Exception):
+        raise result
+    return result
@@ -1,51 +1,17 @@
-import difflib
-import webbrowser
-from jinja2 import Template
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from diffCore import diff_files, render_template
 
 """
 example file paths
 /Users/stevensongerardeustache/Library/Mobile Documents/com~apple~CloudDocs/Software Dev/git_clone/Reveal/Dreamers_Dev_Backend/app_backend/views.py
 /Users/stevensongerardeustache/Library/Mobile Documents/com~apple~CloudDocs/Software Dev/git_clone/Reveal/Dreamers_Prod_Backend/app_backend/views.py
 """
-# Prompt the user for file paths and names
-file1_path = input("Enter the full path to the first file: ")
-while not file1_path:
-    print("You must enter a file path for the first file.\n")
-    file1_path = input("Enter the full path to the first file: ")
-
-file2_path = input("Enter the full path to the second file: ")
-while not file2_path:
-    print("You must enter a file path for the second file.\n")
-    file2_path = input("Enter the full path to the second file: ")
-
-file1_name = input("Enter a name for the first file (or press Enter for default 'File 1'): ") or "File 1"
-
-file2_name = input("Enter a name for the second file (or press Enter for default 'File 2'): ") or "File 2"
 
-# Read the contents of the two files
-try:
-    with open(file1_path, 'r') as file1:
-        file1_content = file1.readlines()
-
-    with open(file2_path, 'r') as file2:
-        file2_content = file2.readlines()
-except Exception as e:
-    print(f"Error reading files: {e}")
-    exit(1)
-
-# Calculate the differences
-differ = difflib.Differ()
-diff = list(differ.compare(file1_content, file2_content))
-
-# Check if there are no differences
-if all(line.startswith('  ') for line in diff):
-    print("\nNo differences between the files.")
-    exit(0)
-else:
-    # Define the HTML template
-    template = Template(
-        """
+# HTML template, compiled once and cached as bytecode by diffCore.render_template
+DIFF_TEMPLATE = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -110,24 +76,58 @@ else:
         </table>
     </body>
     </html>
-    """)
+    """
+
+
+def main():
+    # Prompt the user for file paths and names
+    file1_path = input("Enter the full path to the first file: ")
+    while not file1_path:
+        print("You must enter a file path for the first file.\n")
+        file1_path = input("Enter the full path to the first file: ")
+
+    file2_path = input("Enter the full path to the second file: ")
+    while not file2_path:
+        print("You must enter a file path for the second file.\n")
+        file2_path = input("Enter the full path to the second file: ")
 
-    # Render the HTML with the differences
-    rendered_html = template.render(diff=diff, file1_name=file1_name, file2_name=file2_name)
+    file1_name = input("Enter a name for the first file (or press Enter for default 'File 1'): ") or "File 1"
 
-    # Save the HTML to a file
-    output_html_path = 'diff_viewer.html'
+    file2_name = input("Enter a name for the second file (or press Enter for default 'File 2'): ") or "File 2"
+
+    # Calculate the differences (served from the diff cache when neither file changed)
     try:
-        with open(output_html_path, 'w') as output_file:
-            output_file.write(rendered_html)
+        diff = diff_files(file1_path, file2_path)
     except Exception as e:
-        print(f"Error writing HTML file: {e}")
+        print(f"Error reading files: {e}")
         exit(1)
 
-    # Open the HTML file in the default web browser
-    try:
-        webbrowser.open_new_tab("file:///" + os.path.abspath(output_html_path))
+    # Check if there are no differences
+    if all(line.startswith('  ') for line in diff):
+        print("\nNo differences between the files.")
         exit(0)
-    except Exception as e:
-        print(f"Error opening web browser: {e}")
-        exit(1)
+    else:
+        # Render the HTML with the differences
+        rendered_html = render_template('diff_viewer.html', DIFF_TEMPLATE, diff=diff, file1_name=file1_name, file2_name=file2_name)
+
+        # Save the HTML to a file
+        output_html_path = 'diff_viewer.html'
+        try:
+            with open(output_html_path, 'w') as output_file:
+                output_file.write(rendered_html)
+        except Exception as e:
+            print(f"Error writing HTML file: {e}")
+            exit(1)
+
+        # Open the HTML file in the default web browser
+        try:
+            import webbrowser
+            webbrowser.open_new_tab("file:///" + os.path.abspath(output_html_path))
+            exit(0)
+        except Exception as e:
+            print(f"Error opening web browser: {e}")
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
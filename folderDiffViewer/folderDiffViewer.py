@@ -1,13 +1,65 @@
-import difflib
 import os
-from jinja2 import Template
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from diffCore import diff_file_pairs, has_differences, render_template
+
+# HTML template, compiled once and cached as bytecode by diffCore.render_template
+REPORT_TEMPLATE = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Folder and File Differences</title>
+            <style>
+                body {
+                    font-family: Arial, sans-serif;
+                    overflow-x: hidden; /* Hide horizontal overflow */
+                }
+                .container {
+                    display: flex;
+                }
+                .folder {
+                    flex: 1;
+                    padding: 10px;
+                    border: 1px solid #ddd;
+                    max-width: 50%;
+                }
+                .added {
+                    background-color: #e6ffe6;
+                }
+                .removed {
+                    background-color: #ffe6e6;
+                }
+                pre {
+                    white-space: pre-wrap;
+                }
+            </style>
+        </head>
+        <body>
+            <h1>Folder and File Differences</h1>
+            <div class="container">
+                <div class="folder">
+                    <h2>Folder One</h2>
+                    <pre>{{ folder_one_tree }}</pre>
+                </div>
+                <div class="folder">
+                    <h2>Folder Two</h2>
+                    <pre>{{ folder_two_tree }}</pre>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
 
 def compare_folders(folder1_path, folder2_path):
-    differ = difflib.Differ()
     changed_files = {'folder_one': {}, 'folder_two': {}}
+    # Files present in both folders, in walk order, diffed together afterwards
+    file_pairs = []
+    walk_order = []
 
     for root, dirs, files in os.walk(folder1_path):
         relative_path = os.path.relpath(root, folder1_path)
+        walk_order.append(relative_path)
 
         folder2_root = os.path.join(folder2_path, relative_path)
         if not os.path.exists(folder2_root):
@@ -21,31 +73,34 @@ def compare_folders(folder1_path, folder2_path):
             file2_path = os.path.join(folder2_path, relative_file_path)
 
             if os.path.exists(file2_path):
-                try:
-                    with open(file1_path, 'r', encoding='utf-8') as file1, open(file2_path, 'r', encoding='utf-8') as file2:
-                        file1_content = file1.readlines()
-                        file2_content = file2.readlines()
-
-                    # Calculate the differences between file contents
-                    differ = difflib.Differ()
-                    diff = list(differ.compare(file1_content, file2_content))
-
-                    # Check if there are differences
-                    if any(line.startswith('- ') or line.startswith('+ ') for line in diff):
-                        if relative_path not in changed_files['folder_one']:
-                            changed_files['folder_one'][relative_path] = {'added': [], 'removed': []}
-                        changed_files['folder_one'][relative_path]['added'].append(file)
-                except UnicodeDecodeError as e:
-                    print(f"Skipping file due to encoding error: {file1_path} - {e}")
-                    continue
-                except Exception as e:
-                    print(f"Error reading file: {file1_path} - {e}")
+                file_pairs.append((relative_path, file, file1_path, file2_path))
             else:
                 # File exists in folder1 but not in folder2
                 if relative_path not in changed_files['folder_one']:
                     changed_files['folder_one'][relative_path] = {'added': [], 'removed': []}
                 changed_files['folder_one'][relative_path]['removed'].append(file)
 
+    # Calculate the differences between file contents; unchanged pairs come from the diff cache
+    diffs = diff_file_pairs([(file1_path, file2_path) for _, _, file1_path, file2_path in file_pairs], encoding='utf-8')
+    for relative_path, file, file1_path, file2_path in file_pairs:
+        diff = diffs[(file1_path, file2_path)]
+        if isinstance(diff, UnicodeDecodeError):
+            print(f"Skipping file due to encoding error: {file1_path} - {diff}")
+            continue
+        if isinstance(diff, Exception):
+            print(f"Error reading file: {file1_path} - {diff}")
+            continue
+
+        # Check if there are differences
+        if has_differences(diff):
+            if relative_path not in changed_files['folder_one']:
+                changed_files['folder_one'][relative_path] = {'added': [], 'removed': []}
+            changed_files['folder_one'][relative_path]['added'].append(file)
+
+    # List the folders in walk order, as if each pair had been diffed during the walk
+    changed_files['folder_one'] = {path: changed_files['folder_one'][path]
+                                   for path in walk_order if path in changed_files['folder_one']}
+
     for root, dirs, files in os.walk(folder2_path):
         relative_path = os.path.relpath(root, folder2_path)
 
@@ -69,58 +124,12 @@ def compare_folders(folder1_path, folder2_path):
     return changed_files
 
 def generate_html_report(changed_files):
-    template = Template(
-        """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Folder and File Differences</title>
-            <style>
-                body {
-                    font-family: Arial, sans-serif;
-                    overflow-x: hidden; /* Hide horizontal overflow */
-                }
-                .container {
-                    display: flex;
-                }
-                .folder {
-                    flex: 1;
-                    padding: 10px;
-                    border: 1px solid #ddd;
-                    max-width: 50%;
-                }
-                .added {
-                    background-color: #e6ffe6;
-                }
-                .removed {
-                    background-color: #ffe6e6;
-                }
-                pre {
-                    white-space: pre-wrap;
-                }
-            </style>
-        </head>
-        <body>
-            <h1>Folder and File Differences</h1>
-            <div class="container">
-                <div class="folder">
-                    <h2>Folder One</h2>
-                    <pre>{{ folder_one_tree }}</pre>
-                </div>
-                <div class="folder">
-                    <h2>Folder Two</h2>
-                    <pre>{{ folder_two_tree }}</pre>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-    )
-
     folder_one_tree = generate_file_tree(changed_files['folder_one'], 'folder_one_tree')
     folder_two_tree = generate_file_tree(changed_files['folder_two'], 'folder_two_tree')
 
-    rendered_html = template.render(
+    rendered_html = render_template(
+        'folder_comparison.html',
+        REPORT_TEMPLATE,
         folder_one_tree=folder_one_tree,
         folder_two_tree=folder_two_tree
     )
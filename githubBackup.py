@@ -1,139 +1,338 @@
 #!/usr/bin/env python3
-import requests
-import base64
 import json
-import mysql.connector
 from datetime import datetime
 import logging
 import os
-import environ
-# Create an instance of environ.Env
-env = environ.Env()
-
-# Read environment variables from the specified .env file
-env_file_path = os.path.join(os.path.dirname(__file__), '.env')
-
-# Configure logging
-log_filename = 'databaseBackupLog.log'
-logging.basicConfig(filename=log_filename, level=logging.DEBUG)
-with open(env_file_path, 'r') as file:
-    # Read the entire file as a single string
-    file_contents = file.read()
-
-    # You can now work with the file_contents variable
-    print(file_contents)
-
-
-try:
-    # Access environment variables
-    OWNER = env('OWNER')
-    REPO = env('REPO')
-    AUTH = env('AUTH')
-    DB_USER = env('DB_USER')
-    DB_PASSWORD = env('DB_PASSWORD')
-    DB_HOST = env('DB_HOST')
-    DB_NAME = env('DB_NAME')
-    DB_PORT = env('DB_PORT', default=3306, cast=int)
-
-    class DatetimeEncoder(json.JSONEncoder):
-        def default(self, obj):
-            if isinstance(obj, datetime):
-                return obj.strftime('%Y-%m-%d %H:%M:%S')
-            return super().default(obj)
-
-    # Define your GitHub personal access token
-    auth_token = AUTH
-
-    # Define the owner and repo values for your GitHub repository
-    owner = OWNER
-    repo = REPO
-
-    # MySQL database configuration
-    db_config = {
-        'user': DB_USER,
-        'password': DB_PASSWORD,
-        'host': DB_HOST,
-        'database': DB_NAME,
-        'port': DB_PORT,
+import sys
+import time
+from githubUploader import Chunk, GitDataUploader, GitHubUploadError, split_chunks
+
+
+class DatetimeEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.strftime('%Y-%m-%d %H:%M:%S')
+        return super().default(obj)
+
+def estimate_row_bytes(row):
+    """Approximates the payload size of a fetched row (MySQL Connector does not report bytes read)."""
+    size = 0
+    for value in row:
+        if isinstance(value, (bytes, bytearray, str)):
+            size += len(value)
+        elif value is not None:
+            size += 8
+    return size
+
+def rate(amount, seconds):
+    return amount / seconds if seconds else 0.0
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def build_manifest(file_name, run_start, table_stats, chunk_tables, chunk_count, blob_stats,
+                   upload_seconds, upload_result, error=None):
+    """
+    Returns the run manifest. Blobs in `blob_stats` are attributed to the table their chunk
+    came from; a run without `upload_result` is recorded as failed with `error`.
+    """
+    for sha, blob in blob_stats.items():
+        if sha in chunk_tables:
+            stats = table_stats[chunk_tables[sha]]
+            stats['uploaded_chunks'] += 1
+            stats['upload_bytes'] += blob['bytes']
+            stats['upload_seconds'] += blob['latency']
+
+    latencies = sorted(blob['latency'] for blob in blob_stats.values())
+    return {
+        'file_name': file_name,
+        'status': 'uploaded' if upload_result else 'failed',
+        'error': None if upload_result else str(error or 'Upload did not complete'),
+        'commit': upload_result['commit'] if upload_result else None,
+        'wall_seconds': time.perf_counter() - run_start,
+        'tables': table_stats,
+        'totals': {
+            'rows': sum(stats['rows'] for stats in table_stats.values()),
+            'bytes_read': sum(stats['bytes_read'] for stats in table_stats.values()),
+            'read_seconds': sum(stats['read_seconds'] for stats in table_stats.values()),
+            'serialized_bytes': sum(stats['serialized_bytes'] for stats in table_stats.values()),
+            'serialize_seconds': sum(stats['serialize_seconds'] for stats in table_stats.values()),
+            'compressed_bytes': sum(stats['compressed_bytes'] for stats in table_stats.values()),
+            'compress_seconds': sum(stats['compress_seconds'] for stats in table_stats.values()),
+            'chunks': chunk_count,
+            'uploaded_chunks': len(latencies),
+            'upload_bytes': sum(blob['bytes'] for blob in blob_stats.values()),
+            'upload_seconds': upload_seconds,
+            'upload_latency_p50': percentile(latencies, 0.50),
+            'upload_latency_p95': percentile(latencies, 0.95),
+            'commit_seconds': upload_result['commit_seconds'] if upload_result else None,
+        },
     }
 
+def write_manifest(manifest):
+    """
+    Writes the run manifest to `manifests/<file name>.manifest.json` next to the log and
+    appends a one-line summary to the log so throughput can be compared between runs.
+    """
+    manifest_dir = os.path.join(os.path.dirname(__file__), 'manifests')
+    os.makedirs(manifest_dir, exist_ok=True)
+    manifest_path = os.path.join(manifest_dir, manifest['file_name'] + '.manifest.json')
+    with open(manifest_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+
+    totals = manifest['totals']
+    slowest = max(manifest['tables'].items(), key=lambda item: item[1]['read_seconds'], default=(None, None))[0]
+    logging.info(
+        f"backup {manifest['file_name']} status={manifest['status']} wall={manifest['wall_seconds']:.2f}s "
+        f"tables={len(manifest['tables'])} rows={totals['rows']} "
+        f"read={rate(totals['rows'], totals['read_seconds']):.0f}rows/s "
+        f"serialize={rate(totals['serialized_bytes'], totals['serialize_seconds']) / 1e6:.1f}MB/s "
+        f"compress={rate(totals['serialized_bytes'], totals['compress_seconds']) / 1e6:.1f}MB/s "
+        f"ratio={rate(totals['serialized_bytes'], totals['compressed_bytes']):.2f} "
+        f"upload={totals['upload_bytes']}B/{totals['uploaded_chunks']}of{totals['chunks']}chunks/{totals['upload_seconds']:.2f}s "
+        f"slowest_table={slowest}"
+        + (f" error={manifest['error']}" if manifest['error'] else '')
+    )
+
+
+def main():
+    import environ
+
+    # Create an instance of environ.Env
+    env = environ.Env()
+
+    # Read environment variables from the specified .env file
+    env_file_path = os.path.join(os.path.dirname(__file__), '.env')
+
+    # Configure logging
+    log_filename = 'databaseBackupLog.log'
+    logging.basicConfig(filename=log_filename, level=logging.DEBUG)
+    with open(env_file_path, 'r') as file:
+        # Read the entire file as a single string
+        file_contents = file.read()
+
+        # You can now work with the file_contents variable
+        print(file_contents)
+
+
     try:
-        # Connect to the MySQL database
-        connection = mysql.connector.connect(**db_config)
+        # Access environment variables
+        OWNER = env('OWNER')
+        REPO = env('REPO')
+        AUTH = env('AUTH')
+        DB_USER = env('DB_USER')
+        DB_PASSWORD = env('DB_PASSWORD')
+        DB_HOST = env('DB_HOST')
+        DB_NAME = env('DB_NAME')
+        DB_PORT = env('DB_PORT', default=3306, cast=int)
+        GITHUB_API_URL = env('GITHUB_API_URL', default='https://api.github.com')
+        UPLOAD_WORKERS = env('UPLOAD_WORKERS', default=8, cast=int)
+
+        # Define your GitHub personal access token
+        auth_token = AUTH
 
-        # Create a cursor for executing SQL queries
-        cursor = connection.cursor()
+        # Define the owner and repo values for your GitHub repository
+        owner = OWNER
+        repo = REPO
+
+        # Imported here so the MySQL driver is only loaded once the configuration is in place
+        import mysql.connector
+
+        # MySQL database configuration
+        db_config = {
+            'user': DB_USER,
+            'password': DB_PASSWORD,
+            'host': DB_HOST,
+            'database': DB_NAME,
+            'port': DB_PORT,
+        }
 
         try:
-            # Execute the SQL query to retrieve all table names
-            cursor.execute('SHOW TABLES')
+            # Connect to the MySQL database
+            connection = mysql.connector.connect(**db_config)
+
+            # Create a cursor for executing SQL queries
+            cursor = connection.cursor()
+
+            try:
+                run_start = time.perf_counter()
+
+                # Generate a unique file name for the JSON dump
+                file_name = datetime.now().strftime('%m-%d-%Y %H:%M:%S:%f') + '_data.json'
+
+                # Per-table statistics for the run manifest, which is written for every run
+                table_stats = {}
+                chunks = []
+                chunk_tables = {}
+                uploader = None
+                upload_start = None
+                upload_result = None
+                run_error = None
+
+                try:
+                    # Execute the SQL query to retrieve all table names
+                    cursor.execute('SHOW TABLES')
+
+                    # Fetch all rows from the query result
+                    tables = cursor.fetchall()
 
-            # Fetch all rows from the query result
-            tables = cursor.fetchall()
+                    # The JSON document is assembled from one segment per table; each segment is chunked
+                    # on its own so every chunk belongs to exactly one table
+                    chunks.append(Chunk(b'{'))
 
-            # Create a dictionary to store table data
-            table_data = {}
+                    # Iterate through each table
+                    for index, table in enumerate(tables):
+                        table_name = table[0]
 
-            # Iterate through each table
-            for table in tables:
-                table_name = table[0]
+                        # Execute a SELECT query to retrieve all rows from the table
+                        read_start = time.perf_counter()
+                        cursor.execute(f'SELECT * FROM {table_name}')
 
-                # Execute a SELECT query to retrieve all rows from the table
-                cursor.execute(f'SELECT * FROM {table_name}')
+                        # Fetch all rows from the query result
+                        rows = cursor.fetchall()
 
-                # Fetch all rows from the query result
-                rows = cursor.fetchall()
+                        # Convert the rows to a list of dictionaries (each row as a dictionary)
+                        table_rows = [dict(zip(cursor.column_names, row)) for row in rows]
+                        read_seconds = time.perf_counter() - read_start
 
-                # Convert the rows to a list of dictionaries (each row as a dictionary)
-                table_data[table_name] = [dict(zip(cursor.column_names, row)) for row in rows]
+                        # Convert the table data to JSON using the custom encoder
+                        serialize_start = time.perf_counter()
+                        separator = ',' if index else ''
+                        segment = f'{separator}\n{json.dumps(table_name)}: {json.dumps(table_rows, indent=4, cls=DatetimeEncoder)}'.encode('utf-8')
+                        serialize_seconds = time.perf_counter() - serialize_start
 
-            # Convert the table data to JSON using the custom encoder
-            json_data = json.dumps(table_data, indent=4, cls=DatetimeEncoder)
+                        # Split the segment into content-addressed chunks and compress them
+                        compress_start = time.perf_counter()
+                        table_chunks = [Chunk(raw) for raw in split_chunks(segment)]
+                        compress_seconds = time.perf_counter() - compress_start
 
-            # Generate a unique file name for the JSON dump
-            file_name = datetime.now().strftime('%m-%d-%Y %H:%M:%S:%f') + '_data.json'
+                        chunks.extend(table_chunks)
+                        for chunk in table_chunks:
+                            chunk_tables[chunk.sha] = table_name
 
-            # GitHub API URL for creating or updating a file
-            url = f'https://api.github.com/repos/{owner}/{repo}/contents/{file_name}'
+                        compressed_bytes = sum(len(chunk.data) for chunk in table_chunks)
+                        table_stats[table_name] = {
+                            'rows': len(rows),
+                            'bytes_read': sum(estimate_row_bytes(row) for row in rows),
+                            'read_seconds': read_seconds,
+                            'rows_per_second': rate(len(rows), read_seconds),
+                            'serialized_bytes': len(segment),
+                            'serialize_seconds': serialize_seconds,
+                            'serialize_mb_per_second': rate(len(segment), serialize_seconds) / 1e6,
+                            'compressed_bytes': compressed_bytes,
+                            'compress_seconds': compress_seconds,
+                            'compress_mb_per_second': rate(len(segment), compress_seconds) / 1e6,
+                            'compression_ratio': rate(len(segment), compressed_bytes),
+                            'chunks': len(table_chunks),
+                            'uploaded_chunks': 0,
+                            'upload_bytes': 0,
+                            'upload_seconds': 0.0,
+                        }
 
-            # Encode the JSON data as Base64
-            encoded_json_data = base64.b64encode(json_data.encode('utf-8')).decode('utf-8')
+                    chunks.append(Chunk(b'\n}'))
 
-            # Request payload with file data
-            payload = {
-                'message': f'Add file {file_name}',
-                'content': encoded_json_data,
-                'branch': 'main',  # Specify the branch to create/update the file
-            }
+                    # Upload the JSON as content-addressed chunks; blobs already in the repository are skipped
+                    uploader = GitDataUploader(
+                        owner,
+                        repo,
+                        auth_token,
+                        branch='main',  # Specify the branch to add the backup commit to
+                        api_url=GITHUB_API_URL,
+                        max_workers=UPLOAD_WORKERS,
+                        progress_path=os.path.join(os.path.dirname(__file__), '.upload_progress.json'),
+                    )
+                    upload_start = time.perf_counter()
+                    upload_result = uploader.upload_chunks_as(file_name, chunks)
+                    print(f"File uploaded successfully: {upload_result['uploaded']} of {upload_result['chunks']} chunks sent, commit {upload_result['commit']}.")
+                except GitHubUploadError as upload_error:
+                    print(f"Error uploading file to GitHub: {upload_error}")
+                    logging.exception(upload_error)
+                    run_error = upload_error
+                except Exception as error:
+                    run_error = error
+                    raise
+                finally:
+                    if uploader is not None:
+                        uploader.close()
+                    try:
+                        write_manifest(build_manifest(
+                            file_name, run_start, table_stats, chunk_tables, len(chunks),
+                            uploader.blob_stats if uploader is not None else {},
+                            time.perf_counter() - upload_start if upload_start is not None else 0.0,
+                            upload_result, run_error,
+                        ))
+                    except Exception as manifest_error:
+                        logging.exception(manifest_error)
 
-            # Request headers including the GitHub API version and authentication
-            headers = {
-                'Authorization': f'token {auth_token}',
-                'Accept': 'application/vnd.github.v3+json',  # Specify the API version
-            }
+            except Exception as db_error:
+                print(f"Database Error: {db_error}")
+                logging.exception(db_error)
 
-            # Make the PUT request to create or update the file
-            response = requests.put(url, json=payload, headers=headers)
+            finally:
+                # Close the database connection
+                cursor.close()
+                connection.close()
 
-            # Check the response status code
-            if response.status_code == 201:
-                print("File uploaded successfully.")
-            else:
-                print(f"Error uploading file to GitHub: {response.text}")
+        except mysql.connector.Error as conn_error:
+            print(f"Database Connection Error: {conn_error}")
+            logging.exception(conn_error)
 
-        except Exception as db_error:
-            print(f"Database Error: {db_error}")
-            logging.exception(db_error)
+    except Exception as env_error:
+        print(f"Environment Variable Error: {env_error}")
+        logging.exception(env_error)
+
+
+def restore(file_name, out_path):
+    """
+    Downloads the backup `file_name` (e.g. '10-18-2026 23:00:09:897991_data.json', as listed in
+    the repository's backups/ folder or the manifests/ folder) and writes the rebuilt JSON to
+    `out_path`. Uses the same OWNER, REPO, AUTH and GITHUB_API_URL variables as the backup.
+
+    Usage:
+        python githubBackup.py restore "<file name>" <out_path>
+    """
+    import environ
+
+    env = environ.Env()
+    logging.basicConfig(filename='databaseBackupLog.log', level=logging.DEBUG)
+
+    try:
+        uploader = GitDataUploader(
+            env('OWNER'),
+            env('REPO'),
+            env('AUTH'),
+            branch='main',
+            api_url=env('GITHUB_API_URL', default='https://api.github.com'),
+        )
+    except Exception as env_error:
+        print(f"Environment Variable Error: {env_error}")
+        logging.exception(env_error)
+        return False
+
+    try:
+        data = uploader.download(file_name)
+    except GitHubUploadError as restore_error:
+        print(f"Error restoring {file_name} from GitHub: {restore_error}")
+        logging.exception(restore_error)
+        return False
+    finally:
+        uploader.close()
 
-        finally:
-            # Close the database connection
-            cursor.close()
-            connection.close()
+    # Write next to the destination first so an interrupted restore never leaves a partial file
+    tmp_path = f'{out_path}.tmp'
+    with open(tmp_path, 'wb') as out_file:
+        out_file.write(data)
+    os.replace(tmp_path, out_path)
+    print(f"Restored {file_name} ({len(data)} bytes) to {out_path}.")
+    return True
 
-    except mysql.connector.Error as conn_error:
-        print(f"Database Connection Error: {conn_error}")
-        logging.exception(conn_error)
 
-except Exception as env_error:
-    print(f"Environment Variable Error: {env_error}")
-    logging.exception(env_error)
\ No newline at end of file
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'restore':
+        if len(sys.argv) != 4:
+            print('Usage: githubBackup.py restore <file_name> <out_path>')
+            sys.exit(1)
+        sys.exit(0 if restore(sys.argv[2], sys.argv[3]) else 1)
+    main()
@@ -0,0 +1,273 @@
+"""
+In-memory stand-in for the GitHub Git Data API endpoints used by `githubUploader.py`:
+reading a branch ref, commits, trees (optionally recursive) and blobs, and creating blobs,
+trees, commits and refs.
+
+Like GitHub, a tree that references a blob the repository does not have is rejected with 422,
+and a ref update that is not a fast-forward is rejected with 422. Faults can be queued for the
+next blob uploads to exercise retries and resume. Point the uploader at `server.api_url`:
+
+    server = FakeGitHubServer()
+    server.start()
+    uploader = GitDataUploader('owner', 'repo', 'token', api_url=server.api_url)
+"""
+
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _object_sha(kind, payload):
+    return hashlib.sha1(f'{kind} {len(payload)}\0'.encode('utf-8') + payload).hexdigest()
+
+
+class FakeGitHubRepository:
+    def __init__(self):
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        self.refs = {}
+        self.blob_posts = 0
+        self._lock = threading.Lock()
+
+    def create_blob(self, data: bytes):
+        sha = _object_sha('blob', data)
+        with self._lock:
+            self.blob_posts += 1
+            self.blobs[sha] = data
+        return sha
+
+    def create_tree(self, entries, base_tree=None):
+        """
+        Creates a tree from {'path', 'type', 'sha' or 'content'} entries on top of `base_tree`,
+        creating the intermediate trees for nested paths.
+
+        Raises:
+            KeyError: If `base_tree` or a referenced blob does not exist.
+        """
+        with self._lock:
+            root = dict(self.trees[base_tree]) if base_tree else {}
+        for entry in entries:
+            if 'content' in entry:
+                sha = self.create_blob(entry['content'].encode('utf-8'))
+            elif entry['sha'] in self.blobs:
+                sha = entry['sha']
+            else:
+                raise KeyError(entry['sha'])
+            root = self._insert(root, entry['path'].split('/'), sha)
+        return self._store_tree(root)
+
+    def _insert(self, tree, parts, sha):
+        tree = dict(tree)
+        if len(parts) == 1:
+            tree[parts[0]] = ('blob', sha)
+            return tree
+        _, subtree_sha = tree.get(parts[0], ('tree', None))
+        subtree = self.trees[subtree_sha] if subtree_sha else {}
+        tree[parts[0]] = ('tree', self._store_tree(self._insert(subtree, parts[1:], sha)))
+        return tree
+
+    def _store_tree(self, tree):
+        sha = _object_sha('tree', json.dumps(sorted(tree.items())).encode('utf-8'))
+        with self._lock:
+            self.trees[sha] = tree
+        return sha
+
+    def list_tree(self, sha, recursive=False, prefix=''):
+        listing = []
+        for name, (kind, entry_sha) in sorted(self.trees[sha].items()):
+            listing.append({'path': prefix + name, 'mode': '040000' if kind == 'tree' else '100644',
+                            'type': kind, 'sha': entry_sha})
+            if kind == 'tree' and recursive:
+                listing.extend(self.list_tree(entry_sha, True, f'{prefix}{name}/'))
+        return listing
+
+    def create_commit(self, message, tree, parents):
+        """
+        Raises:
+            KeyError: If the tree or a parent commit does not exist.
+        """
+        if tree not in self.trees or any(parent not in self.commits for parent in parents):
+            raise KeyError(tree)
+        commit = {'message': message, 'tree': tree, 'parents': list(parents)}
+        sha = _object_sha('commit', json.dumps(commit, sort_keys=True).encode('utf-8'))
+        with self._lock:
+            self.commits[sha] = commit
+        return sha
+
+    def update_ref(self, branch, sha, create=False):
+        """
+        Returns:
+            bool: False if the update is refused: the ref exists and `create` is set, or the
+                new commit is not a child of the current one.
+        """
+        with self._lock:
+            current = self.refs.get(branch)
+            if create and current is not None:
+                return False
+            if not create and (current is None or current not in self.commits[sha]['parents']):
+                return False
+            self.refs[branch] = sha
+            return True
+
+    def forget_blobs(self, shas):
+        """Drops blobs, like a garbage collection of blobs no tree references."""
+        with self._lock:
+            for sha in shas:
+                self.blobs.pop(sha, None)
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    ROUTE = re.compile(r'^/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/git/(?P<path>[^?]*)(?:\?(?P<query>.*))?$')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self):
+        match = self.ROUTE.match(self.path)
+        if match is None:
+            self._reply(404, {'message': 'Not Found'})
+            return None, None, None
+        repository = self.server.repository(match['owner'], match['repo'])
+        return repository, match['path'], match['query'] or ''
+
+    def _body(self):
+        return json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+    def do_GET(self):
+        repository, path, query = self._route()
+        if repository is None:
+            return
+        kind, _, name = path.partition('/')
+        if kind == 'ref' and name.startswith('heads/'):
+            sha = repository.refs.get(name[len('heads/'):])
+            if sha is None:
+                return self._reply(404, {'message': 'Not Found'})
+            return self._reply(200, {'ref': f'refs/{name}', 'object': {'type': 'commit', 'sha': sha}})
+        if kind == 'commits' and name in repository.commits:
+            commit = repository.commits[name]
+            return self._reply(200, {'sha': name, 'message': commit['message'], 'tree': {'sha': commit['tree']},
+                                     'parents': [{'sha': parent} for parent in commit['parents']]})
+        if kind == 'trees' and name in repository.trees:
+            return self._reply(200, {'sha': name, 'truncated': False,
+                                     'tree': repository.list_tree(name, recursive='recursive' in query)})
+        if kind == 'blobs' and name in repository.blobs:
+            data = repository.blobs[name]
+            return self._reply(200, {'sha': name, 'size': len(data), 'encoding': 'base64',
+                                     'content': base64.b64encode(data).decode('ascii')})
+        self._reply(404, {'message': 'Not Found'})
+
+    def do_POST(self):
+        repository, path, _ = self._route()
+        if repository is None:
+            return
+        body = self._body()
+        if path == 'blobs':
+            fault = self.server.next_fault()
+            if fault == 'error':
+                return self._reply(502, {'message': 'Bad Gateway'})
+            if fault == 'timeout':
+                # The client has given up by now, so there is nobody to answer
+                time.sleep(self.server.fault_delay)
+            if fault in ('timeout', 'disconnect'):
+                self.close_connection = True
+                return
+            return self._reply(201, {'sha': repository.create_blob(base64.b64decode(body['content']))})
+        if path == 'trees':
+            try:
+                sha = repository.create_tree(body['tree'], body.get('base_tree'))
+            except KeyError as err:
+                return self._reply(422, {'message': f'GitRPC::BadObjectState: {err}'})
+            return self._reply(201, {'sha': sha})
+        if path == 'commits':
+            try:
+                sha = repository.create_commit(body['message'], body['tree'], body.get('parents', []))
+            except KeyError as err:
+                return self._reply(422, {'message': f'Object not found: {err}'})
+            return self._reply(201, {'sha': sha})
+        if path == 'refs':
+            if not repository.update_ref(body['ref'][len('refs/heads/'):], body['sha'], create=True):
+                return self._reply(422, {'message': 'Reference already exists'})
+            return self._reply(201, {'ref': body['ref'], 'object': {'type': 'commit', 'sha': body['sha']}})
+        self._reply(404, {'message': 'Not Found'})
+
+    def do_PATCH(self):
+        repository, path, _ = self._route()
+        if repository is None:
+            return
+        body = self._body()
+        if path.startswith('refs/heads/'):
+            if not repository.update_ref(path[len('refs/heads/'):], body['sha']):
+                return self._reply(422, {'message': 'Update is not a fast forward'})
+            return self._reply(200, {'ref': f'refs/{path[len("refs/"):]}', 'object': {'type': 'commit', 'sha': body['sha']}})
+        self._reply(404, {'message': 'Not Found'})
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, fault_delay=2.0):
+        """
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on; 0 picks a free one.
+            fault_delay (float): Seconds a 'timeout' fault holds the response back; use a
+                value above the uploader's `timeout`.
+        """
+        super().__init__((host, port), FakeGitHubHandler)
+        self.repositories = {}
+        self.faults = []
+        self.fault_delay = fault_delay
+        self._lock = threading.Lock()
+
+    @property
+    def api_url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def repository(self, owner, repo):
+        """Returns the repository, creating an empty one on first use."""
+        with self._lock:
+            return self.repositories.setdefault((owner, repo), FakeGitHubRepository())
+
+    def fail_blob_uploads(self, *faults):
+        """Queues faults for the next blob uploads: 'error' (502), 'timeout' or 'disconnect'."""
+        with self._lock:
+            self.faults.extend(faults)
+
+    def next_fault(self):
+        with self._lock:
+            return self.faults.pop(0) if self.faults else None
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve an in-memory stand-in for the GitHub Git Data API.')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    server = FakeGitHubServer(port=args.port)
+    print(f'Set GITHUB_API_URL={server.api_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
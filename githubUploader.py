@@ -0,0 +1,351 @@
+"""
+Chunked, content-addressed uploads to a GitHub repository through the Git Data API.
+
+Instead of pushing one large base64 file through the Contents API, the data is split into
+content-defined chunks on line boundaries. Each chunk is zlib-compressed and addressed by its
+git blob SHA, so a chunk that is already in the repository is never uploaded twice. Missing
+blobs are created concurrently over a pooled session, then a single tree and commit are
+created and the branch ref is moved to it.
+
+Repository layout written by each upload:
+    chunks/<blob sha>                 zlib-compressed chunk (shared across backups)
+    backups/<file name>.chunks.json   ordered list of chunk SHAs needed to rebuild the file
+
+The API base URL is configurable so the uploader can be exercised against a local stand-in
+server that implements the blob, tree, commit and ref endpoints.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+GITHUB_API_URL = 'https://api.github.com'
+CHUNKS_DIR = 'chunks'
+BACKUPS_DIR = 'backups'
+
+# Chunk boundaries are picked where the crc32 of a line matches this mask, so the same rows
+# produce the same chunks no matter what was inserted or removed before them.
+CHUNK_MIN_SIZE = 256 * 1024
+CHUNK_MAX_SIZE = 4 * 1024 * 1024
+CHUNK_BOUNDARY_MASK = (1 << 10) - 1
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GitHubUploadError(Exception):
+    pass
+
+
+def git_blob_sha(data: bytes):
+    """Returns the SHA git assigns to a blob holding `data`."""
+    header = f'blob {len(data)}\0'.encode('utf-8')
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def split_chunks(data: bytes, min_size=CHUNK_MIN_SIZE, max_size=CHUNK_MAX_SIZE,
+                 boundary_mask=CHUNK_BOUNDARY_MASK):
+    """
+    Splits `data` into content-defined chunks that always end on a line boundary.
+
+    A chunk is closed after a line whose crc32 matches `boundary_mask` once the chunk holds at
+    least `min_size` bytes, or as soon as it reaches `max_size` bytes. Because boundaries depend
+    only on the surrounding lines, unchanged regions of the export produce identical chunks
+    from one run to the next.
+
+    Returns:
+        list: The chunks (bytes), which concatenate back to `data`.
+    """
+    chunks = []
+    current = []
+    current_size = 0
+    for line in data.splitlines(keepends=True):
+        current.append(line)
+        current_size += len(line)
+        at_boundary = (zlib.crc32(line) & boundary_mask) == 0
+        if current_size >= max_size or (current_size >= min_size and at_boundary):
+            chunks.append(b''.join(current))
+            current = []
+            current_size = 0
+    if current:
+        chunks.append(b''.join(current))
+    return chunks
+
+
+class Chunk:
+    def __init__(self, raw: bytes, compress_level=6):
+        self.raw_size = len(raw)
+        self.data = zlib.compress(raw, compress_level)
+        self.sha = git_blob_sha(self.data)
+
+    @property
+    def path(self):
+        return f'{CHUNKS_DIR}/{self.sha}'
+
+
+class GitDataUploader:
+    def __init__(self, owner, repo, auth_token, branch='main', api_url=GITHUB_API_URL,
+                 max_workers=8, max_retries=5, backoff=1.0, progress_path=None, timeout=60):
+        """
+        Args:
+            owner (str): Owner of the target GitHub repository.
+            repo (str): Name of the target GitHub repository.
+            auth_token (str): Personal access token used for every request.
+            branch (str): Branch the backup commit is added to.
+            api_url (str): Base URL of the API, e.g. a local stand-in server for testing.
+            max_workers (int): Number of blobs uploaded concurrently.
+            max_retries (int): Attempts per request on transport errors and 429/5xx responses.
+            backoff (float): Base delay in seconds, doubled after each failed attempt.
+            progress_path (str): File recording blobs already created, so an interrupted
+                upload resumes without sending them again. It is tied to the API URL, repository
+                and branch and ignored for any other target. Removed once the ref is updated, or
+                when a tree cannot be created from the blobs it lists.
+            timeout (float): Per-request timeout in seconds.
+        """
+        self.repo_url = f"{api_url.rstrip('/')}/repos/{owner}/{repo}"
+        self.branch = branch
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.progress_path = progress_path
+        self.timeout = timeout
+        self._progress_lock = threading.Lock()
+        self.blob_stats = {}
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Authorization': f'token {auth_token}',
+            'Accept': 'application/vnd.github.v3+json',
+        })
+
+    def close(self):
+        self.session.close()
+
+    def _request(self, method, path, **kwargs):
+        """Sends a request, retrying transport errors (connection, timeout, truncated body) and 429/5xx responses with backoff."""
+        import requests
+
+        url = f'{self.repo_url}/{path}'
+        for attempt in range(self.max_retries):
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as err:
+                if attempt == self.max_retries - 1:
+                    raise GitHubUploadError(f'{method} {path} failed: {err}') from err
+                logging.warning(f'{method} {path} failed, retrying: {err}')
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries - 1:
+                    return response
+                logging.warning(f'{method} {path} returned {response.status_code}, retrying')
+            time.sleep(self.backoff * (2 ** attempt))
+
+    def _request_json(self, method, path, expected, **kwargs):
+        response = self._request(method, path, **kwargs)
+        if response.status_code not in expected:
+            raise GitHubUploadError(f'{method} {path} returned {response.status_code}: {response.text}')
+        return response.json()
+
+    def _load_progress(self):
+        if not self.progress_path or not os.path.exists(self.progress_path):
+            return set()
+        try:
+            with open(self.progress_path, 'r') as progress_file:
+                progress = json.load(progress_file)
+            if progress['repository'] != self.repo_url or progress['branch'] != self.branch:
+                logging.warning(f"Ignoring progress file {self.progress_path} written for "
+                                f"{progress['repository']} ({progress['branch']})")
+                return set()
+            return set(progress['blobs'])
+        except (ValueError, KeyError, TypeError) as err:
+            logging.warning(f'Ignoring unreadable progress file {self.progress_path}: {err}')
+            return set()
+
+    def _save_progress(self, uploaded):
+        if not self.progress_path:
+            return
+        with self._progress_lock:
+            tmp_path = f'{self.progress_path}.tmp'
+            with open(tmp_path, 'w') as progress_file:
+                json.dump({'repository': self.repo_url, 'branch': self.branch, 'blobs': sorted(uploaded)}, progress_file)
+            os.replace(tmp_path, self.progress_path)
+
+    def _clear_progress(self):
+        if self.progress_path and os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+
+    def get_head(self):
+        """
+        Returns:
+            tuple: (commit sha, tree sha) of the branch head, or (None, None) if the branch
+                does not exist yet (e.g. an empty repository).
+        """
+        response = self._request('GET', f'git/ref/heads/{self.branch}')
+        if response.status_code in (404, 409):
+            return None, None
+        if response.status_code != 200:
+            raise GitHubUploadError(f'Reading ref {self.branch} returned {response.status_code}: {response.text}')
+        commit_sha = response.json()['object']['sha']
+        commit = self._request_json('GET', f'git/commits/{commit_sha}', (200,))
+        return commit_sha, commit['tree']['sha']
+
+    def existing_chunks(self, tree_sha):
+        """Returns the SHAs of the chunk blobs already stored under `chunks/` in `tree_sha`."""
+        if tree_sha is None:
+            return set()
+        root = self._request_json('GET', f'git/trees/{tree_sha}', (200,))
+        chunks_tree = next((entry['sha'] for entry in root['tree']
+                            if entry['path'] == CHUNKS_DIR and entry['type'] == 'tree'), None)
+        if chunks_tree is None:
+            return set()
+        listing = self._request_json('GET', f'git/trees/{chunks_tree}', (200,))
+        if listing.get('truncated'):
+            logging.warning('Chunk listing was truncated, some existing chunks will be uploaded again')
+        return {entry['sha'] for entry in listing['tree'] if entry['type'] == 'blob'}
+
+    def _create_blob(self, chunk, uploaded):
+        payload = {'content': base64.b64encode(chunk.data).decode('ascii'), 'encoding': 'base64'}
+        start = time.perf_counter()
+        blob = self._request_json('POST', 'git/blobs', (201,), json=payload)
+        self.blob_stats[chunk.sha] = {
+            'bytes': len(payload['content']),
+            'latency': time.perf_counter() - start,
+        }
+        if blob['sha'] != chunk.sha:
+            raise GitHubUploadError(f"Blob SHA mismatch: expected {chunk.sha}, got {blob['sha']}")
+        with self._progress_lock:
+            uploaded.add(chunk.sha)
+        self._save_progress(uploaded)
+        return chunk.sha
+
+    def upload_chunks(self, chunks, known=()):
+        """
+        Creates the blobs for `chunks` that are neither in `known` nor recorded in the progress
+        file, `max_workers` at a time.
+
+        Returns:
+            int: The number of blobs created.
+        """
+        uploaded = self._load_progress()
+        skip = uploaded | set(known)
+        missing = {chunk.sha: chunk for chunk in chunks if chunk.sha not in skip}
+        if not missing:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # list() re-raises the first failed upload
+            list(executor.map(lambda chunk: self._create_blob(chunk, uploaded), missing.values()))
+        return len(missing)
+
+    def commit_backup(self, file_name, chunks, message, parent_sha=None, base_tree_sha=None):
+        """
+        Creates one tree holding the chunks and the chunk list for `file_name`, commits it on
+        top of `parent_sha` and moves the branch to the new commit.
+
+        Returns:
+            str: The SHA of the new commit.
+        """
+        chunk_list = {
+            'file_name': file_name,
+            'compression': 'zlib',
+            'size': sum(chunk.raw_size for chunk in chunks),
+            'chunks': [chunk.sha for chunk in chunks],
+        }
+        tree_entries = [{'path': chunk.path, 'mode': '100644', 'type': 'blob', 'sha': chunk.sha}
+                        for chunk in {chunk.sha: chunk for chunk in chunks}.values()]
+        tree_entries.append({
+            'path': f'{BACKUPS_DIR}/{file_name}.chunks.json',
+            'mode': '100644',
+            'type': 'blob',
+            'content': json.dumps(chunk_list, indent=4),
+        })
+        tree_payload = {'tree': tree_entries}
+        if base_tree_sha:
+            tree_payload['base_tree'] = base_tree_sha
+        try:
+            tree = self._request_json('POST', 'git/trees', (201,), json=tree_payload)
+        except GitHubUploadError:
+            # The progress file may list blobs this repository does not have (e.g. they were
+            # garbage collected); forget it so the next attempt uploads them again
+            self._clear_progress()
+            raise
+
+        commit_payload = {'message': message, 'tree': tree['sha'], 'parents': [parent_sha] if parent_sha else []}
+        commit = self._request_json('POST', 'git/commits', (201,), json=commit_payload)
+
+        if parent_sha:
+            self._request_json('PATCH', f'git/refs/heads/{self.branch}', (200,), json={'sha': commit['sha']})
+        else:
+            self._request_json('POST', 'git/refs', (201,),
+                               json={'ref': f'refs/heads/{self.branch}', 'sha': commit['sha']})
+        return commit['sha']
+
+    def upload(self, file_name, data: bytes, message=None, attempts=3):
+        """
+        Uploads `data` as `file_name`: chunks it, creates only the missing blobs and commits
+        a single tree referencing them. See `upload_chunks_as`.
+        """
+        return self.upload_chunks_as(file_name, [Chunk(raw) for raw in split_chunks(data)], message, attempts)
+
+    def upload_chunks_as(self, file_name, chunks, message=None, attempts=3):
+        """
+        Uploads already prepared `chunks` whose concatenation is the contents of `file_name`.
+
+        The tree, commit and ref update are retried from a fresh head if the branch moved
+        while uploading or the tree could not be created; in the latter case the progress
+        file is dropped first, so blobs it recorded are uploaded again.
+        Per-blob upload bytes and latency are collected in `self.blob_stats`.
+
+        Returns:
+            dict: 'commit' (new commit SHA), 'chunks' (total chunks), 'uploaded' (blobs created),
+                'raw_bytes', 'compressed_bytes' and 'commit_seconds' (tree, commit and ref update).
+        """
+        message = message or f'Add file {file_name}'
+        uploaded = 0
+        for attempt in range(attempts):
+            parent_sha, base_tree_sha = self.get_head()
+            uploaded += self.upload_chunks(chunks, self.existing_chunks(base_tree_sha))
+            try:
+                commit_start = time.perf_counter()
+                commit_sha = self.commit_backup(file_name, chunks, message, parent_sha, base_tree_sha)
+                commit_seconds = time.perf_counter() - commit_start
+                break
+            except GitHubUploadError as err:
+                if attempt == attempts - 1:
+                    raise
+                logging.warning(f'Committing {file_name} failed, retrying from the current head: {err}')
+        self._clear_progress()
+        return {
+            'commit': commit_sha,
+            'chunks': len(chunks),
+            'uploaded': uploaded,
+            'raw_bytes': sum(chunk.raw_size for chunk in chunks),
+            'compressed_bytes': sum(len(chunk.data) for chunk in chunks),
+            'commit_seconds': commit_seconds,
+        }
+
+    def download(self, file_name):
+        """Rebuilds the contents of a backup previously written by `upload`."""
+        _, tree_sha = self.get_head()
+        if tree_sha is None:
+            raise GitHubUploadError(f'Branch {self.branch} does not exist')
+        tree = self._request_json('GET', f'git/trees/{tree_sha}?recursive=1', (200,))
+        paths = {entry['path']: entry['sha'] for entry in tree['tree'] if entry['type'] == 'blob'}
+        list_sha = paths.get(f'{BACKUPS_DIR}/{file_name}.chunks.json')
+        if list_sha is None:
+            raise GitHubUploadError(f'No backup named {file_name}')
+        chunk_list = json.loads(self._read_blob(list_sha))
+        return b''.join(zlib.decompress(self._read_blob(sha)) for sha in chunk_list['chunks'])
+
+    def _read_blob(self, sha):
+        blob = self._request_json('GET', f'git/blobs/{sha}', (200,))
+        return base64.b64decode(blob['content'])
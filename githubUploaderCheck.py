@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of `githubUploader.py` against the in-memory `githubFake` server.
+
+Runs an upload, an unchanged re-upload, an upload after a small edit, an interrupted upload
+that is resumed, an upload through transient errors and timeouts, and an upload with a stale
+progress file, downloading the backup after each one and comparing it with the input.
+Exits with status 1 if any step fails.
+
+Usage:
+    python githubUploaderCheck.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+from githubFake import FakeGitHubServer
+from githubUploader import GitDataUploader, GitHubUploadError, split_chunks
+
+
+def make_export(rows, seed):
+    """Returns a JSON-like export of `rows` rows, large enough to span several chunks."""
+    rng = random.Random(seed)
+    lines = ['[']
+    for index in range(rows):
+        lines.append(f'    {{"id": {index}, "name": "user{index}", "score": {rng.random():.12f}, '
+                     f'"note": "{rng.getrandbits(128):032x}"}},')
+    lines.append(']')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def main():
+    server = FakeGitHubServer(fault_delay=1.5).start()
+    failures = []
+
+    def check(name, condition, detail=''):
+        print(f"{'ok  ' if condition else 'FAIL'} {name}{f' ({detail})' if detail else ''}")
+        if not condition:
+            failures.append(name)
+
+    def uploader(progress_path, repo='backups', **kwargs):
+        options = {'api_url': server.api_url, 'progress_path': progress_path, 'backoff': 0.01}
+        options.update(kwargs)
+        return GitDataUploader('owner', repo, 'token', **options)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        progress_path = os.path.join(workdir, 'progress.json')
+        data = make_export(40000, seed=1)
+        total_chunks = len(split_chunks(data))
+        client = uploader(progress_path)
+
+        result = client.upload('first.json', data)
+        check('initial upload sends every chunk', result['uploaded'] == total_chunks,
+              f"{result['uploaded']} of {total_chunks}")
+        check('initial upload round-trips', client.download('first.json') == data)
+
+        result = client.upload('second.json', data)
+        check('unchanged re-upload sends nothing', result['uploaded'] == 0, f"{result['uploaded']} sent")
+        check('unchanged re-upload round-trips', client.download('second.json') == data)
+
+        edited = data.replace(b'"name": "user20000"', b'"name": "renamed"')
+        result = client.upload('edited.json', edited)
+        check('small edit sends few chunks', 0 < result['uploaded'] <= 2, f"{result['uploaded']} sent")
+        check('edited upload round-trips', client.download('edited.json') == edited)
+        client.close()
+
+        # Every attempt at the 4th new blob fails, so the run stops with some blobs recorded
+        fresh = make_export(40000, seed=2)
+        fresh_chunks = len(split_chunks(fresh))
+        client = uploader(progress_path, max_workers=1, max_retries=2)
+        server.fail_blob_uploads(*([None] * 3 + ['error', 'error']))
+        try:
+            client.upload('resumed.json', fresh)
+            check('interrupted upload fails', False)
+        except GitHubUploadError:
+            check('interrupted upload fails', True)
+        recorded = client._load_progress()
+        check('interrupted upload records its blobs', len(recorded) >= 3, f'{len(recorded)} recorded')
+        client.close()
+        client = uploader(progress_path)
+        result = client.upload('resumed.json', fresh)
+        check('resumed upload skips recorded blobs', result['uploaded'] == fresh_chunks - len(recorded),
+              f"{result['uploaded']} of {fresh_chunks}")
+        check('resumed upload round-trips', client.download('resumed.json') == fresh)
+        check('progress file removed after commit', not os.path.exists(progress_path))
+        client.close()
+
+        flaky = make_export(20000, seed=3)
+        client = uploader(progress_path, max_workers=1, timeout=0.5)
+        server.fail_blob_uploads('error', 'timeout', 'disconnect')
+        result = client.upload('flaky.json', flaky)
+        check('transient errors, timeouts and disconnects are retried', client.download('flaky.json') == flaky)
+        client.close()
+
+        # A progress file for another repository is ignored
+        other = uploader(progress_path, repo='other')
+        other._save_progress(set(server.repository('owner', 'backups').blobs))
+        other.close()
+        stale = make_export(20000, seed=4)
+        stale_chunks = len(split_chunks(stale))
+        client = uploader(progress_path)
+        result = client.upload('other-target.json', stale)
+        check('progress file for another repository is ignored', result['uploaded'] == stale_chunks,
+              f"{result['uploaded']} of {stale_chunks}")
+        client.close()
+
+        # Blobs recorded as uploaded but gone from the repository are uploaded again
+        lost = make_export(20000, seed=5)
+        client = uploader(progress_path, max_workers=1, max_retries=1)
+        server.fail_blob_uploads(None, 'error')
+        try:
+            client.upload('lost.json', lost)
+        except GitHubUploadError:
+            pass
+        server.repository('owner', 'backups').forget_blobs(client._load_progress())
+        client.close()
+        client = uploader(progress_path)
+        result = client.upload('lost.json', lost)
+        check('stale progress file is dropped and blobs re-uploaded', client.download('lost.json') == lost)
+        client.close()
+
+    server.stop()
+    if failures:
+        print(f"\n{len(failures)} check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
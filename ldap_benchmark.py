@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for `ldap_script.py` against the in-memory `ldap_fake` directory.
+
+Seeds a stand-in directory with synthetic users and posixGroups, then measures ops/sec and
+latency percentiles for user lookups, group listings, single user moves and bulk moves at
+several concurrency levels, going through `LdapConnectionPool` the way the daemon does.
+`--latency` simulates the network round trip so pooling, caching and pipelining show up
+in the numbers.
+
+Every scenario and concurrency level runs against a freshly seeded directory, and each worker
+thread moves only its own share of the users, so concurrent moves never conflict and the
+numbers measure pipelining rather than retries and rollbacks.
+
+Usage:
+    python ldap_benchmark.py --users 5000 --groups 20 --latency 0.002 --concurrency 1 4 16
+    python ldap_benchmark.py --scenarios lookup --cache-ttl 0     # caching disabled
+"""
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ldap_fake import FakeLdapDirectory
+from ldap_script import LdapConnectionPool, LdapGroupIndex, TtlLruCache
+
+SCENARIOS = ['lookup', 'group', 'move', 'bulk_move']
+
+
+def seed_directory(directory: FakeLdapDirectory, users: int, groups: int, base_dn: str = 'dc=bt,dc=com'):
+    """
+    Adds `users` posixAccounts spread round-robin over `groups` posixGroups.
+
+    Returns:
+        tuple: (usernames, group names)
+    """
+    group_names = [f'group{index}' for index in range(groups)]
+    members = {name: [] for name in group_names}
+    usernames = []
+    for index in range(users):
+        username = f'user{index}'
+        group_index = index % groups
+        directory.add_entry(f'cn={username},{base_dn}', {
+            'objectClass': ['inetOrgPerson', 'posixAccount'],
+            'cn': [username],
+            'sn': [username],
+            'uid': [username],
+            'uidNumber': [10000 + index],
+            'gidNumber': [5000 + group_index],
+            'homeDirectory': [f'/home/{username}'],
+            'loginShell': ['/bin/bash'],
+            'userPassword': ['{SSHA}synthetic'],
+        })
+        members[group_names[group_index]].append(username)
+        usernames.append(username)
+    for group_index, name in enumerate(group_names):
+        directory.add_entry(f'cn={name},ou=Groups,{base_dn}', {
+            'objectClass': ['posixGroup'],
+            'cn': [name],
+            'gidNumber': [5000 + group_index],
+            'memberUid': members[name],
+        })
+    return usernames, group_names
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_scenario(pool: LdapConnectionPool, operation, count: int, concurrency: int):
+    """
+    Runs `count` calls of `operation(client, worker, call)` on `concurrency` worker threads.
+    Worker `worker` makes its calls (numbered from 0) one after another, so operations that
+    only touch the worker's own data never race with each other.
+
+    Returns:
+        tuple: (sorted latencies in seconds, wall time in seconds). Latency includes waiting
+            for a pooled connection.
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def run_worker(worker):
+        timings = []
+        for call in range(len(range(worker, count, concurrency))):
+            start = time.perf_counter()
+            with pool.connection() as client:
+                operation(client, worker, call)
+            timings.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(timings)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run_worker, range(concurrency)))
+    return sorted(latencies), time.perf_counter() - start
+
+
+def build_operation(scenario: str, usernames, group_names, bulk_size: int, seed: int, concurrency: int):
+    rng = random.Random(seed)
+    users = [rng.choice(usernames) for _ in range(100000)]
+    groups = [rng.choice(group_names) for _ in range(100000)]
+    # Moves draw from disjoint per-worker shares of the users
+    shuffled = list(usernames)
+    rng.shuffle(shuffled)
+    shares = [shuffled[worker::concurrency] for worker in range(concurrency)]
+
+    def pick(values, worker, call):
+        return values[(call * concurrency + worker) % len(values)]
+
+    if scenario == 'lookup':
+        return lambda client, worker, call: client.get_user_account(pick(users, worker, call))
+    if scenario == 'group':
+        return lambda client, worker, call: client.get_all_user_account(pick(groups, worker, call))
+    if scenario == 'move':
+        def move(client, worker, call):
+            share = shares[worker]
+            client.update_user_and_add_to_group(share[call % len(share)], pick(groups, worker, call))
+        return move
+    if scenario == 'bulk_move':
+        def bulk_move(client, worker, call):
+            share = shares[worker]
+            start = call * bulk_size
+            client.update_users_and_add_to_groups([
+                (share[(start + offset) % len(share)], pick(groups, worker, start + offset))
+                for offset in range(min(bulk_size, len(share)))
+            ])
+        return bulk_move
+    raise ValueError(f'Unknown scenario {scenario}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ldap_script.py against an in-memory LDAP stand-in.')
+    parser.add_argument('--users', type=int, default=5000, help='Synthetic users to seed.')
+    parser.add_argument('--groups', type=int, default=20, help='Synthetic posixGroups to seed.')
+    parser.add_argument('--latency', type=float, default=0.001, help='Simulated round trip per LDAP operation, in seconds.')
+    parser.add_argument('--operations', type=int, default=1000, help='Calls per scenario and concurrency level.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help='Concurrency levels (also the pool size).')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--bulk-size', type=int, default=100, help='Users moved per bulk_move call.')
+    parser.add_argument('--cache-ttl', type=float, default=300, help='User cache and group index TTL; 0 disables caching.')
+    parser.add_argument('--max-value-range', type=int, default=None, help='Split attributes with more values, like AD range retrieval.')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    base_dn = 'dc=bt,dc=com'
+    print(f"{'scenario':<10} {'conc':>5} {'calls':>6} {'items/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ldap ops':>9}")
+    for scenario in args.scenarios:
+        for concurrency in args.concurrency:
+            # A fresh directory per row, so earlier moves do not change what later rows measure
+            directory = FakeLdapDirectory(latency=args.latency, max_value_range=args.max_value_range)
+            usernames, group_names = seed_directory(directory, args.users, args.groups, base_dn)
+            pool = LdapConnectionPool(
+                size=concurrency,
+                user_cache=TtlLruCache(ttl=args.cache_ttl),
+                group_index=LdapGroupIndex(ttl=args.cache_ttl),
+                connection_factory=directory.connect,
+                bind_dn=directory.bind_dn,
+                bind_password=directory.bind_password,
+                base_dn=base_dn,
+            )
+            operation = build_operation(scenario, usernames, group_names, args.bulk_size, args.seed, concurrency)
+            latencies, wall = run_scenario(pool, operation, args.operations, concurrency)
+            pool.close()
+            print(
+                f"{scenario:<10} {concurrency:>5} {args.operations:>6} "
+                f"{args.operations * (min(args.bulk_size, args.users // concurrency) if scenario == 'bulk_move' else 1) / wall:>10.1f} "
+                f"{percentile(latencies, 0.50) * 1000:>8.2f} {percentile(latencies, 0.95) * 1000:>8.2f} "
+                f"{percentile(latencies, 0.99) * 1000:>8.2f} {directory.operations:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
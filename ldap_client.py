@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Thin client for `ldap_script.py daemon`.
+
+Takes the same arguments as `ldap_script.py` and forwards them over the daemon's Unix socket,
+so each call skips importing python-ldap, connecting and binding. When no daemon is listening
+it falls back to running the action in-process.
+
+The socket defaults to $XDG_RUNTIME_DIR/ldap_script.sock, or to a private 0700 directory
+/tmp/ldap_script-<uid>/ when XDG_RUNTIME_DIR is not set (LDAP_SCRIPT_SOCKET overrides both).
+The client only talks to a socket owned by the current user, so another local user cannot
+stand in for the daemon.
+
+Usage:
+    python ldap_script.py daemon [socket_path]        # start the daemon once
+    python ldap_client.py userAccount Dana
+    python ldap_client.py moveUser bob admin_access
+"""
+
+import json
+import os
+import socket
+import sys
+
+# Fallback socket directory when XDG_RUNTIME_DIR is not set; the daemon creates it with mode 0700
+PRIVATE_SOCKET_DIR = os.path.join(os.environ.get('TMPDIR', '/tmp'), f'ldap_script-{os.getuid()}')
+DEFAULT_SOCKET_PATH = os.environ.get('LDAP_SCRIPT_SOCKET') or os.path.join(
+    os.environ.get('XDG_RUNTIME_DIR') or PRIVATE_SOCKET_DIR, 'ldap_script.sock')
+
+
+def call_daemon(argv, socket_path=DEFAULT_SOCKET_PATH, timeout=60):
+    """
+    Sends one action to the daemon.
+
+    Args:
+        argv (list): Arguments in `sys.argv` form, e.g. ['ldap_client.py', 'userAccount', 'Dana'].
+
+    Returns:
+        dict: {'response': ...} on success or {'error': '...'} if the daemon rejected the action.
+
+    Raises:
+        OSError: If no daemon is listening on `socket_path`.
+        PermissionError: If `socket_path` belongs to another user.
+    """
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise PermissionError(f'{socket_path} is not owned by the current user')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps({'argv': argv}).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as reply:
+            return json.loads(reply.readline())
+
+
+if __name__ == "__main__":
+    try:
+        reply = call_daemon(sys.argv)
+    except (FileNotFoundError, ConnectionRefusedError, PermissionError) as e:
+        if isinstance(e, PermissionError):
+            print(f'Ignoring daemon socket: {e}', file=sys.stderr)
+        from ldap_script import LdapConnectivity
+        print(LdapConnectivity().main(sys.argv))
+        sys.exit(0)
+    if 'error' in reply:
+        print(reply['error'], file=sys.stderr)
+        sys.exit(0)
+    print(reply['response'])
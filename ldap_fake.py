@@ -0,0 +1,331 @@
+"""
+In-memory stand-in for an LDAP directory that implements the subset of the python-ldap
+`LDAPObject` API used by `ldap_script.py`: simple bind, `search_s`/`modify_s`, the
+asynchronous `search`/`search_ext`/`modify` + `result`/`result3` calls, the Simple Paged
+Results control and range retrieval.
+
+Filters support &, |, ! and equality/presence matches (case-insensitive), which covers every
+filter `ldap_script.py` builds. Use it with `LdapConnectivity(connection_factory=directory.connect)`.
+
+`restart` drops every open connection like a server restart: the next call on an old connection
+raises `ldap.SERVER_DOWN`. As with `ReconnectLDAPObject`, the synchronous `*_s` calls reconnect
+by themselves and the asynchronous ones need an explicit `reconnect`.
+"""
+
+import itertools
+import threading
+import time
+
+import ldap
+from ldap.controls import SimplePagedResultsControl
+
+
+def _normalize_dn(dn):
+    return ','.join(part.strip().lower() for part in dn.split(','))
+
+
+def _parse_filter(filterstr):
+    """Parses an RFC 4515 filter into nested tuples: ('&'|'|', [...]), ('!', f), ('=', attr, value)."""
+    def parse(pos):
+        if filterstr[pos] != '(':
+            raise ldap.FILTER_ERROR(filterstr)
+        op = filterstr[pos + 1]
+        if op in '&|':
+            children = []
+            pos += 2
+            while filterstr[pos] == '(':
+                child, pos = parse(pos)
+                children.append(child)
+            return (op, children), pos + 1
+        if op == '!':
+            child, pos = parse(pos + 2)
+            return ('!', child), pos + 1
+        end = filterstr.index(')', pos)
+        attr, value = filterstr[pos + 1:end].split('=', 1)
+        return ('=', attr.lower(), _unescape(value)), end + 1
+    node, _ = parse(0)
+    return node
+
+
+def _unescape(value):
+    if value == '*':
+        return None
+    out = []
+    i = 0
+    while i < len(value):
+        if value[i] == '\\':
+            out.append(chr(int(value[i + 1:i + 3], 16)))
+            i += 3
+        else:
+            out.append(value[i])
+            i += 1
+    return ''.join(out)
+
+
+def _matches(node, entry):
+    if node[0] == '&':
+        return all(_matches(child, entry) for child in node[1])
+    if node[0] == '|':
+        return any(_matches(child, entry) for child in node[1])
+    if node[0] == '!':
+        return not _matches(node[1], entry)
+    values = entry.get(node[1])
+    if not values:
+        return False
+    if node[2] is None:
+        return True
+    wanted = node[2].lower().encode('utf-8')
+    return any(value.lower() == wanted for value in values)
+
+
+class FakeLdapDirectory:
+    def __init__(self, bind_dn='cn=admin,dc=bt,dc=com', bind_password='adminpassword', latency=0.0,
+                 size_limit=None, max_value_range=None):
+        """
+        Args:
+            bind_dn (str): The only DN allowed to bind.
+            bind_password (str): Its password.
+            latency (float): Simulated network round trip in seconds added to every operation.
+                Asynchronous operations overlap, so pipelined requests pay it once.
+            size_limit (int): Like the server size limit; searches returning more entries without
+                the paged results control raise `ldap.SIZELIMIT_EXCEEDED`.
+            max_value_range (int): Like Active Directory's MaxValRange; attributes with more
+                values are returned in 'attr;range=low-high' slices.
+        """
+        self.bind_dn = bind_dn
+        self.bind_password = bind_password
+        self.latency = latency
+        self.size_limit = size_limit
+        self.max_value_range = max_value_range
+        self.entries = {}
+        self.operations = 0
+        self.generation = 0
+        self._lock = threading.Lock()
+        # (attribute, value) -> entry keys, so equality filters do not scan every entry
+        self._index = {}
+        self._suffixes = set()
+        self._position = {}
+
+    def _store(self, key, dn, attrs):
+        if key in self.entries:
+            for name, values in self.entries[key][1].items():
+                for value in values:
+                    self._index.get((name.lower(), value.lower()), set()).discard(key)
+        else:
+            self._position[key] = len(self._position)
+            parts = key.split(',')
+            self._suffixes.update(','.join(parts[index:]) for index in range(len(parts)))
+        self.entries[key] = (dn, attrs)
+        for name, values in attrs.items():
+            for value in values:
+                self._index.setdefault((name.lower(), value.lower()), set()).add(key)
+
+    def _candidates(self, node):
+        """Returns the keys that can match `node` using the index, or None if a scan is needed."""
+        if node[0] == '=' and node[2] is not None:
+            return set(self._index.get((node[1], node[2].lower().encode('utf-8')), ()))
+        if node[0] == '|':
+            children = [self._candidates(child) for child in node[1]]
+            return None if any(child is None for child in children) else set().union(*children)
+        if node[0] == '&':
+            return next((child for child in map(self._candidates, node[1]) if child is not None), None)
+        return None
+
+    def add_entry(self, dn, attrs):
+        self._store(_normalize_dn(dn), dn, {
+            name: [value if isinstance(value, bytes) else str(value).encode('utf-8') for value in values]
+            for name, values in attrs.items()
+        })
+
+    def restart(self):
+        """Drops every open connection; they raise `ldap.SERVER_DOWN` until they reconnect."""
+        with self._lock:
+            self.generation += 1
+
+    def connect(self, uri=None, **kwargs):
+        """Returns a new connection; usable as the `connection_factory` of `LdapConnectivity`."""
+        return FakeLdapConnection(self)
+
+    def search(self, base, scope, filterstr='(objectClass=*)', attrlist=None, paged=None):
+        node = _parse_filter(filterstr)
+        base_key = _normalize_dn(base)
+        with self._lock:
+            self.operations += 1
+            if base_key not in self._suffixes:
+                raise ldap.NO_SUCH_OBJECT({'desc': 'No such object', 'matched': base})
+            if scope == ldap.SCOPE_BASE:
+                keys = [base_key] if base_key in self.entries else []
+            else:
+                candidates = self._candidates(node)
+                keys = list(self.entries) if candidates is None else sorted(candidates, key=self._position.get)
+            results = []
+            for key in keys:
+                dn, attrs = self.entries[key]
+                if scope == ldap.SCOPE_BASE and key != base_key:
+                    continue
+                if scope == ldap.SCOPE_ONELEVEL and key.split(',', 1)[-1] != base_key:
+                    continue
+                if scope == ldap.SCOPE_SUBTREE and not (key == base_key or key.endswith(',' + base_key)):
+                    continue
+                lowered = {name.lower(): values for name, values in attrs.items()}
+                if _matches(node, lowered):
+                    results.append((dn, self._project(attrs, attrlist)))
+        if paged is None:
+            if self.size_limit is not None and len(results) > self.size_limit:
+                raise ldap.SIZELIMIT_EXCEEDED({'desc': 'Size limit exceeded'})
+            return results, None
+        offset = int(paged.cookie or 0)
+        page = results[offset:offset + paged.size]
+        next_offset = offset + paged.size
+        cookie = str(next_offset).encode() if next_offset < len(results) else b''
+        return page, SimplePagedResultsControl(True, size=paged.size, cookie=cookie)
+
+    def _project(self, attrs, attrlist):
+        requested = {}
+        for name in attrlist or ['*']:
+            base, _, value_range = name.partition(';range=')
+            requested[base.lower()] = int(value_range.split('-')[0]) if value_range else 0
+        projected = {}
+        for name, values in attrs.items():
+            if '*' not in requested and name.lower() not in requested:
+                continue
+            low = requested.get(name.lower(), 0)
+            if self.max_value_range is None or (low == 0 and len(values) <= self.max_value_range):
+                projected[name] = list(values)
+                continue
+            high = low + self.max_value_range - 1
+            if high >= len(values) - 1:
+                projected[f'{name};range={low}-*'] = values[low:]
+            else:
+                projected[f'{name};range={low}-{high}'] = values[low:high + 1]
+        return projected
+
+    def modify(self, dn, modlist):
+        key = _normalize_dn(dn)
+        with self._lock:
+            self.operations += 1
+            if key not in self.entries:
+                raise ldap.NO_SUCH_OBJECT({'desc': 'No such object', 'matched': dn})
+            entry_dn, attrs = self.entries[key]
+            updated = {name: list(values) for name, values in attrs.items()}
+            for operation, name, values in modlist:
+                if isinstance(values, bytes):
+                    values = [values]
+                existing_name = next((each for each in updated if each.lower() == name.lower()), name)
+                current = updated.get(existing_name, [])
+                if operation == ldap.MOD_REPLACE:
+                    updated[existing_name] = list(values)
+                elif operation == ldap.MOD_ADD:
+                    for value in values:
+                        if value in current:
+                            raise ldap.TYPE_OR_VALUE_EXISTS({'desc': 'Type or value exists'})
+                    updated[existing_name] = current + list(values)
+                elif operation == ldap.MOD_DELETE:
+                    for value in values or []:
+                        if value not in current:
+                            raise ldap.NO_SUCH_ATTRIBUTE({'desc': 'No such attribute'})
+                    remaining = [value for value in current if value not in (values or current)]
+                    if remaining:
+                        updated[existing_name] = remaining
+                    else:
+                        updated.pop(existing_name, None)
+            self._store(key, entry_dn, updated)
+
+
+class FakeLdapConnection:
+    """One client connection to a `FakeLdapDirectory`, with its own outstanding async requests."""
+    _msgids = itertools.count(1)
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.bound = False
+        self.generation = directory.generation
+        self._credentials = None
+        self._pending = {}
+
+    def _round_trip(self):
+        if self.directory.latency:
+            time.sleep(self.directory.latency)
+
+    def _check(self):
+        if self.generation != self.directory.generation:
+            raise ldap.SERVER_DOWN({'desc': "Can't contact LDAP server"})
+
+    def _check_or_reconnect(self):
+        """Like `ReconnectLDAPObject`, synchronous calls reconnect and rebind transparently."""
+        if self.generation != self.directory.generation:
+            self.reconnect()
+
+    def reconnect(self, uri=None, retry_max=1, retry_delay=0.0, force=True):
+        self.generation = self.directory.generation
+        self._pending.clear()
+        if self._credentials is not None:
+            self.simple_bind_s(*self._credentials)
+
+    def _submit(self, operation):
+        self._check()
+        msgid = next(self._msgids)
+        try:
+            outcome = (operation(), None)
+        except ldap.LDAPError as err:
+            outcome = (None, err)
+        self._pending[msgid] = (time.monotonic() + self.directory.latency, outcome)
+        return msgid
+
+    def set_option(self, option, value):
+        pass
+
+    def simple_bind_s(self, who='', cred=''):
+        self._round_trip()
+        self.generation = self.directory.generation
+        if who != self.directory.bind_dn or cred != self.directory.bind_password:
+            raise ldap.INVALID_CREDENTIALS({'desc': 'Invalid credentials'})
+        self._credentials = (who, cred)
+        self.bound = True
+
+    def whoami_s(self):
+        self._check_or_reconnect()
+        self._round_trip()
+        return f'dn:{self.directory.bind_dn}'
+
+    def unbind_s(self):
+        self.bound = False
+
+    def search_s(self, base, scope, filterstr='(objectClass=*)', attrlist=None, attrsonly=0):
+        self._check_or_reconnect()
+        self._round_trip()
+        return self.directory.search(base, scope, filterstr, attrlist)[0]
+
+    def search(self, base, scope, filterstr='(objectClass=*)', attrlist=None, attrsonly=0):
+        return self._submit(lambda: (ldap.RES_SEARCH_RESULT, self.directory.search(base, scope, filterstr, attrlist)[0], []))
+
+    def search_ext(self, base, scope, filterstr='(objectClass=*)', attrlist=None, attrsonly=0, serverctrls=None, **kwargs):
+        paged = next((ctrl for ctrl in serverctrls or [] if ctrl.controlType == SimplePagedResultsControl.controlType), None)
+
+        def run():
+            data, control = self.directory.search(base, scope, filterstr, attrlist, paged)
+            return ldap.RES_SEARCH_RESULT, data, [control] if control else []
+        return self._submit(run)
+
+    def modify_s(self, dn, modlist):
+        self._check_or_reconnect()
+        self._round_trip()
+        self.directory.modify(dn, modlist)
+
+    def modify(self, dn, modlist):
+        return self._submit(lambda: (ldap.RES_MODIFY, [], self.directory.modify(dn, modlist) or []))
+
+    def result3(self, msgid, all=1, timeout=None):
+        self._check()
+        ready_at, (value, error) = self._pending.pop(msgid)
+        delay = ready_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if error is not None:
+            raise error
+        rtype, data, controls = value
+        return rtype, data, msgid, controls
+
+    def result(self, msgid, all=1, timeout=None):
+        rtype, data, _, _ = self.result3(msgid, all, timeout)
+        return rtype, data
@@ -1,9 +1,24 @@
+import json
 import logging
+import os
+import queue
+import signal
+import socket
+import socketserver
+import stat
 import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import List
 
 import ldap
 from ldap import MOD_REPLACE, MOD_ADD, MOD_DELETE
+from ldap.controls import SimplePagedResultsControl
+from ldap.filter import escape_filter_chars
+
+from ldap_client import DEFAULT_SOCKET_PATH, PRIVATE_SOCKET_DIR
 
 logging.basicConfig(
     level=logging.ERROR, 
@@ -12,9 +27,193 @@ logging.basicConfig(
     datefmt="%m-%d-%Y - %H:%M"
     )
 
+LDAP_URI = os.environ.get('LDAP_URI', 'ldap://10.0.0.120')
+LDAP_BIND_DN = os.environ.get('LDAP_BIND_DN', 'cn=admin,dc=bt,dc=com')
+LDAP_BIND_PASSWORD = os.environ.get('LDAP_BIND_PASSWORD', 'adminpassword')
+LDAP_BASE_DN = os.environ.get('LDAP_BASE_DN', 'dc=bt,dc=com')
+# Comma-separated attributes returned by the user lookups, e.g. 'uid,cn,telephoneNumber' or '*'
+LDAP_USER_ATTRIBUTES = [name.strip() for name in os.environ.get('LDAP_USER_ATTRIBUTES', '').split(',') if name.strip()]
+
+
+def reconnecting_connection(uri: str):
+    """
+    Default connection factory: a connection whose synchronous `*_s` calls reconnect and rebind
+    on SERVER_DOWN. The asynchronous calls are retried by `LdapConnectivity` itself.
+    """
+    return ldap.ldapobject.ReconnectLDAPObject(uri, retry_max=3, retry_delay=1.0)
+
+
+class TtlLruCache():
+    def __init__(self, max_size: int = 10000, ttl: float = 300):
+        """
+        A thread-safe mapping that holds at most `max_size` entries, evicting the least recently
+        used one first, and treats entries older than `ttl` seconds as missing.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LdapGroupIndex():
+    def __init__(self, ttl: float = 300, max_members: int = 10000, miss_reload_interval: float = 30):
+        """
+        In-memory index of every posixGroup's cn <-> gidNumber, plus the memberUid values of
+        the groups whose membership has been fetched.
+
+        The index is loaded with a single paged search for cn and gidNumber only, and reloaded
+        once it is older than `ttl` seconds, when `invalidate` is called, or when a lookup
+        misses. A miss only forces a reload if the index is older than `miss_reload_interval`
+        seconds, so unknown names or gids cannot trigger a reload per lookup. A reload drops
+        the cached memberships. Moves made through `LdapConnectivity` update it in place.
+
+        Memberships are fetched per group on first use and stored with `set_members`; those
+        larger than `max_members` are not kept, so callers stream them every time.
+        """
+        self.ttl = ttl
+        self.max_members = max_members
+        self.miss_reload_interval = miss_reload_interval
+        self.reload_lock = threading.Lock()
+        self._gid_by_name = {}
+        self._name_by_gid = {}
+        self._members = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    @property
+    def miss_reload_allowed(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.miss_reload_interval
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def load(self, entries):
+        """Replaces the index with the given (dn, entry) posixGroup search results."""
+        gid_by_name, name_by_gid = {}, {}
+        for _, entry in entries:
+            name = entry['cn'][0].decode('utf-8')
+            gid = int(entry['gidNumber'][0])
+            gid_by_name[name] = gid
+            name_by_gid[gid] = name
+        with self._lock:
+            self._gid_by_name, self._name_by_gid, self._members = gid_by_name, name_by_gid, {}
+            self._loaded_at = time.monotonic()
+
+    def gid_for_name(self, name: str):
+        return self._gid_by_name.get(name)
+
+    def name_for_gid(self, gid: int):
+        return self._name_by_gid.get(int(gid))
+
+    def members(self, name: str):
+        """Returns the group's members, or None if they have not been fetched or are too many to keep."""
+        with self._lock:
+            members = self._members.get(name)
+            return None if members is None else list(members)
+
+    def set_members(self, name: str, usernames):
+        """Stores a group's fetched members, unless the group is unknown or has more than `max_members`."""
+        with self._lock:
+            if name in self._gid_by_name and len(usernames) <= self.max_members:
+                self._members[name] = dict.fromkeys(usernames)
+
+    def add_member(self, name: str, username: str):
+        with self._lock:
+            members = self._members.get(name)
+            if members is not None:
+                members[username] = None
+
+    def remove_member(self, name: str, username: str):
+        with self._lock:
+            members = self._members.get(name)
+            if members is not None:
+                members.pop(username, None)
+
+
 class LdapConnectivity():
-    def __init__(self):
-        pass
+    # Default attributes returned by the user lookups; userPassword is never returned
+    USER_ATTRIBUTES = [
+        'cn', 'sn', 'givenName', 'displayName', 'uid', 'uidNumber', 'gidNumber',
+        'homeDirectory', 'loginShell', 'gecos', 'mail', 'description',
+    ]
+    # Always requested: group resolution and the moves depend on them
+    REQUIRED_USER_ATTRIBUTES = ['cn', 'uid', 'gidNumber']
+
+    def __init__(self, batch_size: int = 100, max_in_flight: int = 500, page_size: int = 500,
+                 user_cache: TtlLruCache = None, group_index: LdapGroupIndex = None,
+                 uri: str = None, bind_dn: str = None, bind_password: str = None, base_dn: str = None,
+                 connection_factory=reconnecting_connection, user_attributes: List[str] = None):
+        """
+        Connection settings default to the LDAP_URI, LDAP_BIND_DN, LDAP_BIND_PASSWORD and
+        LDAP_BASE_DN environment variables, and `user_attributes` to LDAP_USER_ATTRIBUTES.
+
+        Args:
+            batch_size (int): Usernames combined into one OR filter by the bulk APIs.
+            max_in_flight (int): Asynchronous requests outstanding at once in the bulk APIs.
+            page_size (int): Entries per page for paged searches.
+            user_cache (TtlLruCache): Cache of user entries, shared by pooled connections.
+            group_index (LdapGroupIndex): Group index, shared by pooled connections.
+            uri (str): LDAP server URI, e.g. 'ldap://10.0.0.120'.
+            bind_dn (str): DN used for the simple bind.
+            bind_password (str): Password used for the simple bind.
+            base_dn (str): Directory suffix; users live directly under it and groups under
+                'ou=Groups' below it.
+            connection_factory (callable): Called with `uri` to create the connection object,
+                e.g. `ldap_fake.FakeLdapDirectory.connect` for a local stand-in directory.
+            user_attributes (list): Attributes requested by the user lookups (default:
+                `USER_ATTRIBUTES`). Add site-specific attributes such as 'telephoneNumber' here,
+                or pass ['*'] to return every attribute as before. `REQUIRED_USER_ATTRIBUTES`
+                are always added.
+        """
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.page_size = page_size
+        self.user_cache = user_cache if user_cache is not None else TtlLruCache()
+        self.group_index = group_index if group_index is not None else LdapGroupIndex()
+        self.uri = uri or LDAP_URI
+        self.bind_dn = bind_dn or LDAP_BIND_DN
+        self.bind_password = bind_password if bind_password is not None else LDAP_BIND_PASSWORD
+        self.base_dn = base_dn or LDAP_BASE_DN
+        self.connection_factory = connection_factory
+        user_attributes = user_attributes or LDAP_USER_ATTRIBUTES or self.USER_ATTRIBUTES
+        if '*' not in user_attributes:
+            user_attributes = list(dict.fromkeys(list(user_attributes) + self.REQUIRED_USER_ATTRIBUTES))
+        self.user_attributes = user_attributes
+        self.conn = None
+
+    def _group_dn(self, group_name: str):
+        return f"cn={group_name},ou=Groups,{self.base_dn}"
 
     def initialize_connection(self):    
         """
@@ -24,6 +223,11 @@ class LdapConnectivity():
         and attempts to bind using provided admin credentials. If the connection or
         authentication fails, it handles the errors and logs appropriate messages.
 
+        By default the connection is a `ReconnectLDAPObject`, which transparently reconnects and
+        rebinds when an operation fails with `ldap.SERVER_DOWN`, so long-lived pooled
+        connections survive server restarts. Calling it again unbinds the previous connection
+        before opening a new one.
+
         Returns:
             bool: True if the connection and binding are successful, False otherwise.
 
@@ -42,11 +246,17 @@ class LdapConnectivity():
             else:
                 print("Failed to initialize LDAP connection.")
         """
+        if self.conn is not None:
+            try:
+                self.conn.unbind_s()
+            except Exception:
+                pass
+            self.conn = None
         try:
-            self.conn = ldap.initialize("ldap://10.0.0.120")
+            self.conn = self.connection_factory(self.uri)
             self.conn.set_option(ldap.OPT_REFERRALS, 0)
-            username = 'cn=admin,dc=bt,dc=com'
-            password = 'adminpassword'
+            username = self.bind_dn
+            password = self.bind_password
             self.conn.simple_bind_s(username, password)
             return(True)
         except ldap.INVALID_CREDENTIALS:
@@ -56,14 +266,128 @@ class LdapConnectivity():
             logging.error('Connection to server failed')
             return(False)
 
+    def reconnect(self):
+        """
+        Reconnects and rebinds after `ldap.SERVER_DOWN` in an asynchronous call, which
+        `ReconnectLDAPObject` only handles for the synchronous `*_s` calls.
+
+        Raises:
+            ldap.SERVER_DOWN: If the server is still unreachable.
+        """
+        logging.error('Connection to server lost, reconnecting')
+        if hasattr(self.conn, 'reconnect'):
+            self.conn.reconnect(self.uri)
+        elif not self.initialize_connection():
+            raise ldap.SERVER_DOWN({'desc': "Can't contact LDAP server"})
+
+    def paged_search(self, base: str, filterstr: str, attrlist=None):
+        """
+        Yields the (dn, entry) results of a subtree search, fetched `page_size` entries at a time
+        with the Simple Paged Results control so large result sets stay under the server's size
+        limit.
+
+        If the connection is down when the first page is requested, it is reconnected and the
+        search retried once. The paging cookie does not survive a reconnect, so losing the
+        connection on a later page raises `ldap.SERVER_DOWN`.
+        """
+        control = SimplePagedResultsControl(True, size=self.page_size, cookie=b'')
+        first_page = True
+        while True:
+            try:
+                msgid = self.conn.search_ext(base, ldap.SCOPE_SUBTREE, filterstr, attrlist, serverctrls=[control])
+                _, data, _, serverctrls = self.conn.result3(msgid)
+            except ldap.SERVER_DOWN:
+                if not first_page:
+                    raise
+                self.reconnect()
+                msgid = self.conn.search_ext(base, ldap.SCOPE_SUBTREE, filterstr, attrlist, serverctrls=[control])
+                _, data, _, serverctrls = self.conn.result3(msgid)
+            first_page = False
+            for each in data:
+                if each[0] is not None:
+                    yield each
+            page_control = next((ctrl for ctrl in serverctrls
+                                 if ctrl.controlType == SimplePagedResultsControl.controlType), None)
+            if page_control is None or not page_control.cookie:
+                return
+            control.cookie = page_control.cookie
+
+    def refresh_group_index(self, force: bool = False):
+        """
+        Reloads the group index with one paged search if it is stale. `force` also reloads it
+        after a lookup miss, at most once per `miss_reload_interval`.
+        """
+        index = self.group_index
+        if not (index.stale or (force and index.miss_reload_allowed)):
+            return
+        with index.reload_lock:
+            # Another pooled connection may have reloaded it while this one waited
+            if not (index.stale or (force and index.miss_reload_allowed)):
+                return
+            index.load(self.paged_search(self.base_dn, "(objectClass=posixGroup)", ['cn', 'gidNumber']))
+
+    def group_name_for_gid(self, gid):
+        """Resolves a gidNumber to a group name; a miss may reload the index (see `refresh_group_index`)."""
+        self.refresh_group_index()
+        name = self.group_index.name_for_gid(gid)
+        if name is None:
+            self.refresh_group_index(force=True)
+            name = self.group_index.name_for_gid(gid)
+        return name
+
+    def gid_for_group_name(self, group_name: str):
+        """Resolves a group name to its gidNumber; a miss may reload the index (see `refresh_group_index`)."""
+        self.refresh_group_index()
+        gid = self.group_index.gid_for_name(group_name)
+        if gid is None:
+            self.refresh_group_index(force=True)
+            gid = self.group_index.gid_for_name(group_name)
+        return gid
+
+    def _iter_ranged_values(self, dn: str, entry: dict, attr: str):
+        """
+        Yields the values of a multi-valued attribute of `entry`. When the server splits the
+        attribute with range retrieval ('memberUid;range=0-1499'), the remaining ranges are
+        requested one base search at a time.
+        """
+        prefix = f"{attr.lower()};range="
+        while True:
+            ranged = next((key for key in entry if key.lower().startswith(prefix)), None)
+            if ranged is None:
+                yield from next((values for key, values in entry.items() if key.lower() == attr.lower()), [])
+                return
+            yield from entry[ranged]
+            high = ranged.rsplit('-', 1)[1]
+            if high == '*':
+                return
+            result = self.conn.search_s(dn, ldap.SCOPE_BASE, "(objectClass=*)", [f"{attr};range={int(high) + 1}-*"])
+            entry = result[0][1] if result else {}
+
+    def iter_group_members(self, group_name: str):
+        """
+        Yields the memberUid values of a group straight from the directory.
+
+        Only the memberUid attribute is requested, and range retrieval is followed, so groups
+        with tens of thousands of members can be streamed with bounded memory.
+
+        Raises:
+            ldap.NO_SUCH_OBJECT: If the group does not exist.
+        """
+        dn = self._group_dn(group_name)
+        result = self.conn.search_s(dn, ldap.SCOPE_BASE, "(objectClass=*)", ['memberUid'])
+        if not result:
+            return
+        for value in self._iter_ranged_values(dn, result[0][1], 'memberUid'):
+            yield value.decode('utf-8') if isinstance(value, bytes) else value
+
     def get_all_user_account(self, group_name: str):
         """
         Retrieves all user accounts (memberUid) for a specified LDAP group.
 
-        This method takes the name of an LDAP group as input, constructs the Distinguished Name (DN)
-        for the search query, and performs a subtree search to retrieve all users (memberUid) belonging
-        to the specified group. The method decodes the returned byte strings to Unicode strings and
-        returns a list of user accounts.
+        This method takes the name of an LDAP group as input and returns its members. The
+        membership is fetched from the directory with `iter_group_members` on first use and
+        kept in the group index, unless the group has more than `max_members` members. Use
+        `iter_group_members` directly to process very large groups with bounded memory.
 
         Args:
             group_name (str): The name of the LDAP group to query (e.g., 'no_access').
@@ -77,6 +401,7 @@ class LdapConnectivity():
         Raises:
             ldap.INVALID_DN_SYNTAX: If the constructed DN has an invalid syntax.
             ldap.NO_SUCH_OBJECT: If the specified LDAP group does not exist.
+            ldap.SERVER_DOWN: Not caught, so a pooled connection is marked unhealthy.
 
         Example:
             user_accounts = self.get_all_user_account('no_access')
@@ -86,31 +411,30 @@ class LdapConnectivity():
                 print("Failed to retrieve user accounts.")
 
         Workflow:
-            1. Constructs the DN using the provided group name.
-            2. Performs a subtree search with the filter '(memberUid=*)'.
-            3. Decodes each memberUid from byte string to Unicode string.
-            4. Appends the decoded usernames to the response list.
-            5. Returns the list of usernames or an error message if an exception occurs.
+            1. Loads the group index if it is missing or stale.
+            2. Returns 'Invalid AD Group Name' if the group is not in the index after a reload.
+            3. Returns the group's memberUid values from the index, or fetches them with
+               `iter_group_members` and stores them in the index.
 
         Logging:
             Logs any unexpected exceptions with the error message.
         """
         try:
-            response = []
-            dn = f"cn={group_name},ou=groups,dc=bt,dc=com"
-            result = self.conn.search_s(dn, ldap.SCOPE_SUBTREE, "(memberUid=*)")
-            all_accounts = result[0][1]['memberUid']
-            for each_account in all_accounts:
-                if isinstance(each_account, bytes):
-                    each_account = each_account.decode('utf-8')
-                    response.append(each_account)
-                else:
-                    response.append(each_account)
+            if self.gid_for_group_name(group_name) is None:
+                return('Invalid AD Group Name')
+            response = self.group_index.members(group_name)
+            if response is None:
+                response = list(self.iter_group_members(group_name))
+                self.group_index.set_members(group_name, response)
+            if not response:
+                return(False)
             return response
         except ldap.INVALID_DN_SYNTAX:
             return('Invalid DN')
         except ldap.NO_SUCH_OBJECT:
             return('Invalid AD Group Name')      
+        except ldap.SERVER_DOWN:
+            raise
         except Exception as err:
             logging.error(f"==>> err: {err}")
             return(False)
@@ -130,7 +454,10 @@ class LdapConnectivity():
         Returns:
             dict: A dictionary containing the user account details with decoded Unicode strings.
                 The dictionary includes the following keys:
-                    - All user attributes except 'objectClass' and 'userPassword'.
+                    - The user's `user_attributes` that are set (never 'objectClass' or
+                      'userPassword'). By default these are `USER_ATTRIBUTES`, so other
+                      site-specific attributes (e.g. 'telephoneNumber') are only returned when
+                      listed in `user_attributes` or LDAP_USER_ATTRIBUTES, or when it is '*'.
                     - 'gName': The name of the Active Directory group (AD group) the user belongs to.
             str: 'Invalid User Account' if the user account is not found.
             str: 'Failed to Retrieve the User Account' if an unexpected error occurs.
@@ -148,33 +475,43 @@ class LdapConnectivity():
 
         Workflow:
             1. Constructs the base DN for searching the LDAP directory.
-            2. Performs a subtree search using the username filter `(uId={username})`.
-            3. Removes sensitive attributes ('objectClass' and 'userPassword') from the response.
+            2. Performs a subtree search using the escaped username filter `(uId={username})`, requesting
+               only `user_attributes`.
+            3. Makes sure sensitive attributes ('objectClass' and 'userPassword') are not in the response.
             4. Decodes all byte string attributes to Unicode strings.
-            5. Retrieves the AD group name based on the user's `gidNumber`.
+            5. Resolves the AD group name from the user's `gidNumber` with the group index.
             6. Updates the user account dictionary with the group name ('gName').
-            7. Returns the processed user account information.
+            7. Caches and returns the processed user account information.
 
         Logging:
             - Logs any unexpected exceptions with the error message (if applicable).
 
         Notes:
-            - This method removes sensitive data like 'userPassword' from the returned dictionary.
+            - This method never requests sensitive data like 'userPassword'.
             - The method converts all byte strings to Unicode strings for ease of use.
+            - Repeat lookups are served from `user_cache` until the entry expires or is
+              invalidated by a move.
         """
         try:
-            dn = "dc=bt, dc=com"
-            response = self.conn.search_s(dn, ldap.SCOPE_SUBTREE, f"(uId={username})")[0][1]
-            del response['objectClass'] 
-            del response['userPassword'] 
+            cached = self.user_cache.get(username.lower())
+            if cached is not None:
+                return dict(cached)
+            dn = self.base_dn
+            response = self.conn.search_s(dn, ldap.SCOPE_SUBTREE, f"(uId={escape_filter_chars(username)})", self.user_attributes)[0][1]
+            response.pop('objectClass', None)
+            response.pop('userPassword', None)
             for each_response_key, each_response_value in response.items():
                 response[each_response_key] = each_response_value[0].decode('utf-8')
-            group_response = self.conn.search_s(dn, ldap.SCOPE_SUBTREE, f"(gidNumber={response['gidNumber']})", ['cn'])
-            ad_group_name = group_response[-1][1]['cn'][0].decode('utf-8')
+            ad_group_name = self.group_name_for_gid(response['gidNumber'])
+            if ad_group_name is None:
+                raise IndexError(response['gidNumber'])
             response['gName'] = ad_group_name
+            self.user_cache.set(username.lower(), dict(response))
             return response
         except IndexError:
             return("Invalid User Account")
+        except ldap.SERVER_DOWN:
+            raise
         except Exception as err:
             logging.error(f"==>> err: {err}")
             return("Failed to Retrieve the User Account")
@@ -192,19 +529,19 @@ class LdapConnectivity():
             target_group (str): The target group to move the user to (e.g., 'admin_access', 'no_access').
 
         Group Mapping:
-            gNumber (dict): A mapping of group names to their corresponding gidNumbers:
-                - "admin_access": 500
-                - "no_access": 502
+            Group names and gidNumbers are resolved with the group index, which is loaded from
+            the directory's posixGroup entries.
 
         Workflow:
             1. Retrieve the user's account information using `get_user_account`.
             2. Construct the user's DN (Distinguished Name) and the target group's DN.
-            3. Determine the user's current group based on their gidNumber.
+            3. Determine the user's current group and the target gidNumber from the group index.
             4. Update the user's gidNumber to match the target group.
             5. If the user's current group differs from the target group:
                 - Remove the user from the current group's 'memberUid' attribute.
             6. Add the user to the target group's 'memberUid' attribute.
             7. If any step fails, rollback the changes to maintain consistency.
+            8. Invalidate the user's cached entry and update the group index membership.
 
         Raises:
             ldap.ALREADY_EXISTS: If the user is already a member of the target group.
@@ -213,84 +550,561 @@ class LdapConnectivity():
         Returns:
             None
         """
-        gNumber = {
-            "admin_access": 500,
-            "no_access": 502
-        }
-
         account_info = self.get_user_account(username)
-        if not account_info:
+        if not isinstance(account_info, dict):
             return("User not found.")
 
-        user_dn = f"cn={account_info['cn']},dc=bt,dc=com"
-        target_group_dn = f"cn={target_group},ou=Groups,dc=bt,dc=com"
+        user_dn = f"cn={account_info['cn']},{self.base_dn}"
+        target_group_dn = self._group_dn(target_group)
 
         current_gid_number = int(account_info['gidNumber'])
-        current_group = None
-        for group, gid in gNumber.items():
-            if gid == current_gid_number:
-                current_group = group
-                break
+        current_group = self.group_name_for_gid(current_gid_number)
 
         if not current_group:
             return("Current group not found for the user.")
 
-        current_group_dn = f"cn={current_group},ou=Groups,dc=bt,dc=com"
+        current_group_dn = self._group_dn(current_group)
+
+        target_gid_number = self.gid_for_group_name(target_group)
+        if target_gid_number is None:
+            return(f"LDAP Error: unknown group '{target_group}'")
 
-        new_gid_number = str(gNumber[target_group]).encode()
+        new_gid_number = str(target_gid_number).encode()
         current_gid_number_bytes = str(current_gid_number).encode()
         mod_list_gid = [(MOD_REPLACE, 'gidNumber', new_gid_number)]
         mod_add_username = [(MOD_ADD, 'memberUid', username.encode())]
         mod_remove_username = [(MOD_DELETE, 'memberUid', username.encode())]
 
+        self.user_cache.invalidate(username.lower())
         try:
             self.conn.modify_s(user_dn, mod_list_gid)
             if current_group != target_group:
                 try:
                     self.conn.modify_s(current_group_dn, mod_remove_username)
-                    return("successfully moved the user")
                 except ldap.LDAPError as e:
                     self.conn.modify_s(user_dn, [(MOD_REPLACE, 'gidNumber', current_gid_number_bytes)])
                     raise e
 
             try:
                 self.conn.modify_s(target_group_dn, mod_add_username)
+                self.group_index.remove_member(current_group, username)
+                self.group_index.add_member(target_group, username)
                 return("successfully moved the user")
             except ldap.LDAPError as e:
                 self.conn.modify_s(user_dn, [(MOD_REPLACE, 'gidNumber', current_gid_number_bytes)])
                 if current_group != target_group:
                     self.conn.modify_s(current_group_dn, mod_add_username)
                 raise e
+        except ldap.SERVER_DOWN:
+            self.group_index.invalidate()
+            raise
         except ldap.LDAPError:
+            self.group_index.invalidate()
             return(f"User '{username}' is already a member of the group '{target_group}'.")
         except Exception as e:
+            self.group_index.invalidate()
             return(f"LDAP Error: {e}")
 
+    def _decode_user_entry(self, entry: dict):
+        entry.pop('objectClass', None)
+        entry.pop('userPassword', None)
+        return {key: value[0].decode('utf-8') for key, value in entry.items()}
+
+    def _search_many(self, base: str, filters: List[str], attrlist=None):
+        """
+        Runs several subtree searches with the asynchronous API, keeping up to `max_in_flight`
+        requests outstanding, and returns the concatenated (dn, entry) results.
+
+        A batch that fails with `ldap.SERVER_DOWN` is sent again once after reconnecting.
+        """
+        def run_batch(batch):
+            msgids = [self.conn.search(base, ldap.SCOPE_SUBTREE, each_filter, attrlist) for each_filter in batch]
+            batch_results = []
+            for msgid in msgids:
+                _, data = self.conn.result(msgid)
+                batch_results.extend(each for each in data if each[0] is not None)
+            return batch_results
+
+        results = []
+        for start in range(0, len(filters), self.max_in_flight):
+            batch = filters[start:start + self.max_in_flight]
+            try:
+                results.extend(run_batch(batch))
+            except ldap.SERVER_DOWN:
+                self.reconnect()
+                results.extend(run_batch(batch))
+        return results
+
+    def _modify_many(self, changes: dict):
+        """
+        Issues the modifications in `changes` ({key: (dn, modlist)}) with the asynchronous
+        `modify` call, keeping up to `max_in_flight` requests outstanding.
+
+        If the connection goes down, it is reconnected once and the modifications whose result
+        was not received are sent again.
+
+        Returns:
+            dict: {key: ldap.LDAPError} for every modification that failed.
+
+        Raises:
+            ldap.SERVER_DOWN: If the connection goes down again after reconnecting.
+        """
+        errors = {}
+        items = list(changes.items())
+        reconnected = False
+        for start in range(0, len(items), self.max_in_flight):
+            batch = items[start:start + self.max_in_flight]
+            while batch:
+                confirmed = set()
+                try:
+                    pending = [(key, self.conn.modify(dn, modlist)) for key, (dn, modlist) in batch]
+                    for key, msgid in pending:
+                        try:
+                            self.conn.result(msgid)
+                        except ldap.SERVER_DOWN:
+                            raise
+                        except ldap.LDAPError as err:
+                            errors[key] = err
+                        confirmed.add(key)
+                    batch = []
+                except ldap.SERVER_DOWN:
+                    if reconnected:
+                        raise
+                    self.reconnect()
+                    reconnected = True
+                    batch = [(key, change) for key, change in batch if key not in confirmed]
+        return errors
+
+    def _modify_group_members(self, operation, members_by_group: dict):
+        """
+        Adds or removes memberUid values with one multi-value modify per group. If a group's
+        modify fails (one bad value rejects the whole request), its members are retried one by
+        one so that only the users that really failed are reported.
+
+        Returns:
+            set: The usernames whose memberUid change failed.
+        """
+        group_changes = {
+            group: (self._group_dn(group), [(operation, 'memberUid', [username.encode() for username in usernames])])
+            for group, usernames in members_by_group.items() if usernames
+        }
+        failed_groups = self._modify_many(group_changes)
+        user_changes = {
+            username: (self._group_dn(group), [(operation, 'memberUid', username.encode())])
+            for group in failed_groups for username in members_by_group[group]
+        }
+        return set(self._modify_many(user_changes))
+
+    def get_user_accounts(self, usernames: List[str]):
+        """
+        Retrieves the account details for many users with a handful of round trips.
+
+        Cached users are served from `user_cache`. The rest are looked up in batches of
+        `batch_size` with combined OR filters, every batch sent with the asynchronous `search`
+        call so the batches are in flight at the same time. Group names come from the group index.
+
+        Args:
+            usernames (list): The UIDs of the users to query (e.g., ['Dana', 'bob']).
+
+        Returns:
+            dict: {username: account} where account is the dictionary `get_user_account` would
+                return, or 'Invalid User Account' if the user does not exist.
+            str: 'Failed to Retrieve the User Account' if an unexpected error occurs.
+
+        Raises:
+            ldap.SERVER_DOWN: If the server is still unreachable after one reconnect.
+        """
+        try:
+            dn = self.base_dn
+            wanted = list(dict.fromkeys(usernames))
+            found = {}
+            for username in wanted:
+                cached = self.user_cache.get(username.lower())
+                if cached is not None:
+                    found[username.lower()] = dict(cached)
+            missing = [username for username in wanted if username.lower() not in found]
+            user_filters = [
+                "(|" + "".join(f"(uId={escape_filter_chars(username)})" for username in missing[start:start + self.batch_size]) + ")"
+                for start in range(0, len(missing), self.batch_size)
+            ]
+            # Each distinct gidNumber is resolved once per call
+            group_names = {}
+            for _, entry in self._search_many(dn, user_filters, self.user_attributes):
+                account = self._decode_user_entry(entry)
+                gid = account.get('gidNumber')
+                if gid is not None and gid not in group_names:
+                    group_names[gid] = self.group_name_for_gid(gid)
+                account['gName'] = group_names.get(gid)
+                found[account.get('uid', '').lower()] = account
+                self.user_cache.set(account.get('uid', '').lower(), dict(account))
+
+            response = {}
+            for username in wanted:
+                account = found.get(username.lower())
+                response[username] = account if account is not None else "Invalid User Account"
+            return response
+        except ldap.SERVER_DOWN:
+            raise
+        except Exception as err:
+            logging.error(f"==>> err: {err}")
+            return("Failed to Retrieve the User Account")
+
+    def update_users_and_add_to_groups(self, moves: List[tuple]):
+        """
+        Moves many users between groups, pipelining the LDAP modifications.
+
+        Accounts are fetched with `get_user_accounts` and groups are resolved with the group
+        index, which is updated for every successful move. The gidNumber updates are all sent with the
+        asynchronous `modify` call, then the memberUid changes are grouped into one multi-value
+        modify per group. Each user keeps the same guarantees as `update_user_and_add_to_group`:
+        if removing the user from the current group fails, the gidNumber is restored; if adding
+        the user to the target group fails, the gidNumber is restored and the user is put back
+        in the current group.
+
+        Args:
+            moves (list): (username, target_group) pairs, e.g. [('bob', 'admin_access')].
+                If a username appears more than once, the last target wins.
+
+        Returns:
+            dict: {username: message} with the same messages `update_user_and_add_to_group` returns.
+            str: 'Failed to Retrieve the User Account' if the accounts could not be looked up.
+        """
+        targets = dict(moves)
+        accounts = self.get_user_accounts(list(targets))
+        if not isinstance(accounts, dict):
+            return accounts
+
+        response = {}
+        pending = {}
+        # Each distinct group is resolved once per call, so a misspelled target group or an
+        # orphaned gidNumber costs at most one index reload
+        group_names = {}
+        target_gids = {}
+        for username, target_group in targets.items():
+            account_info = accounts.get(username)
+            if not isinstance(account_info, dict):
+                response[username] = "User not found."
+                continue
+            current_gid_number = int(account_info['gidNumber'])
+            if current_gid_number not in group_names:
+                group_names[current_gid_number] = self.group_name_for_gid(current_gid_number)
+            current_group = group_names[current_gid_number]
+            if not current_group:
+                response[username] = "Current group not found for the user."
+                continue
+            if target_group not in target_gids:
+                target_gids[target_group] = self.gid_for_group_name(target_group)
+            target_gid_number = target_gids[target_group]
+            if target_gid_number is None:
+                response[username] = f"LDAP Error: unknown group '{target_group}'"
+                continue
+            pending[username] = {
+                'user_dn': f"cn={account_info['cn']},{self.base_dn}",
+                'current_group': current_group,
+                'target_group': target_group,
+                'current_gid': str(current_gid_number).encode(),
+                'target_gid': str(target_gid_number).encode(),
+            }
+            self.user_cache.invalidate(username.lower())
+
+        def fail(usernames):
+            for username in usernames:
+                response[username] = f"User '{username}' is already a member of the group '{pending[username]['target_group']}'."
+                del pending[username]
+
+        def restore_gid(usernames):
+            errors = self._modify_many({
+                username: (pending[username]['user_dn'], [(MOD_REPLACE, 'gidNumber', pending[username]['current_gid'])])
+                for username in usernames
+            })
+            for username, err in errors.items():
+                logging.error(f"==>> failed to restore gidNumber of {username}: {err}")
+                self.group_index.invalidate()
+
+        gid_errors = self._modify_many({
+            username: (move['user_dn'], [(MOD_REPLACE, 'gidNumber', move['target_gid'])])
+            for username, move in pending.items()
+        })
+        fail(gid_errors)
+
+        removals = {}
+        for username, move in pending.items():
+            if move['current_group'] != move['target_group']:
+                removals.setdefault(move['current_group'], []).append(username)
+        removal_errors = self._modify_group_members(MOD_DELETE, removals)
+        restore_gid(removal_errors)
+        fail(removal_errors)
+
+        additions = {}
+        for username, move in pending.items():
+            additions.setdefault(move['target_group'], []).append(username)
+        addition_errors = self._modify_group_members(MOD_ADD, additions)
+        restore_gid(addition_errors)
+        readd = {}
+        for username in addition_errors:
+            move = pending[username]
+            if move['current_group'] != move['target_group']:
+                readd.setdefault(move['current_group'], []).append(username)
+        for username in self._modify_group_members(MOD_ADD, readd):
+            logging.error(f"==>> failed to restore {username} to group {pending[username]['current_group']}")
+            self.group_index.invalidate()
+        fail(addition_errors)
+
+        for username, move in pending.items():
+            self.group_index.remove_member(move['current_group'], username)
+            self.group_index.add_member(move['target_group'], username)
+            response[username] = "successfully moved the user"
+        return response
+
+    def handle_action(self, action: List['str']):
+        """
+        Dispatches a single action on the already bound connection.
+
+        Args:
+            action (list): Arguments in `sys.argv` form, e.g.
+                ['ldap_script.py', 'moveUser', 'bob', 'admin_access'].
+
+        Returns:
+            The response of the requested action.
+
+        Raises:
+            ValueError: If the action is unknown or its parameters are invalid.
+        """
+        if action[1] == 'allUserAccountByGroupName':
+            if (len(action) == 3) and (self.gid_for_group_name(action[2]) is None):
+                raise ValueError('Correct AD Group Name Parameter Required')
+            return self.get_all_user_account(action[2])
+        elif action[1] == 'userAccount':
+            if len(action) != 3:
+                raise ValueError('Only Username Parameter Required')
+            return self.get_user_account(action[2])
+        elif action[1] == 'userAccounts':
+            if len(action) < 3:
+                raise ValueError('At Least One Username Parameter Required')
+            return self.get_user_accounts(action[2:])
+        elif action[1] == 'moveUser':
+            return self.update_user_and_add_to_group(action[2], action[3])
+        elif action[1] == 'moveUsers':
+            if len(action) < 4:
+                raise ValueError('Target Group and At Least One Username Parameter Required')
+            return self.update_users_and_add_to_groups([(username, action[2]) for username in action[3:]])
+        raise ValueError(f'Unknown action {action[1]}')
+
     def main(self, action: List['str']):
         try:
             establish_connection = self.initialize_connection() 
             if establish_connection == False:
                 logging.error('Failed to Authenticate')
                 exit(0)
-
-            if action[1] == 'allUserAccountByGroupName':
-                if (len(action) == 3) and (action[2] not in ['access', 'admin_access']):
-                    logging.error('Correct AD Group Name Parameter Required')
-                    exit(0)
-                response = self.get_all_user_account(action[2])    
-            elif action[1] == 'userAccount':
-                if len(action) != 3:
-                    logging.error('Only Username Parameter Required')
-                    exit(0)
-                response = self.get_user_account(action[2])
-            elif action[1] == 'moveUser':
-                response = self.update_user_and_add_to_group(action[2], action[3])
+            response = self.handle_action(action)
+        except ValueError as e:
+            logging.error(e)
+            exit(0)
         except Exception as e:
             logging.error(f"==>> e: {e}")
             return('Check the Required Parameters for the Endpoint')
         return response
- 
+
+
+class LdapConnectionPool():
+    def __init__(self, size: int = 4, health_check_interval: float = 30, acquire_timeout: float = 30,
+                 user_cache: TtlLruCache = None, group_index: LdapGroupIndex = None, **client_options):
+        """
+        A pool of bound `LdapConnectivity` instances shared by the daemon's worker threads.
+
+        Connections are created lazily up to `size`. A connection idle for longer than
+        `health_check_interval` seconds, or returned after an exception escaped its
+        `connection()` block, is checked with a `whoami_s` before it is handed out and is
+        re-initialized and rebound if the check fails (e.g. `ldap.SERVER_DOWN`).
+        All connections share one user cache and group index, so a lookup or move served by
+        one connection is visible to the others.
+
+        Args:
+            size (int): Maximum number of bound connections.
+            health_check_interval (float): Idle seconds after which a connection is checked.
+            acquire_timeout (float): Seconds to wait for a free connection before failing.
+            user_cache (TtlLruCache): Shared user cache; a default one is created if omitted.
+            group_index (LdapGroupIndex): Shared group index; a default one is created if omitted.
+            **client_options: Passed to every `LdapConnectivity`, e.g. `uri` or `connection_factory`.
+        """
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.user_cache = user_cache if user_cache is not None else TtlLruCache()
+        self.group_index = group_index if group_index is not None else LdapGroupIndex()
+        self.client_options = client_options
+
+    def _create(self):
+        client = LdapConnectivity(user_cache=self.user_cache, group_index=self.group_index, **self.client_options)
+        if not client.initialize_connection():
+            raise ConnectionError('Failed to Authenticate')
+        return client
+
+    def _is_healthy(self, client):
+        try:
+            client.conn.whoami_s()
+            return True
+        except ldap.LDAPError as err:
+            logging.error(f"==>> health check failed, rebinding: {err}")
+            return False
+
+    def acquire(self):
+        try:
+            client, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return self._create()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            try:
+                client, last_used = self._idle.get(timeout=self.acquire_timeout)
+            except queue.Empty:
+                raise TimeoutError('No LDAP connection available')
+
+        if time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(client):
+            if not client.initialize_connection():
+                self.discard(client)
+                raise ConnectionError('Failed to Authenticate')
+        return client
+
+    def release(self, client, healthy: bool = True):
+        # An unhealthy connection is queued as if it had been idle forever, so the next
+        # `acquire` checks it first
+        self._idle.put((client, time.monotonic() if healthy else float('-inf')))
+
+    def discard(self, client):
+        try:
+            client.conn.unbind_s()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        client = self.acquire()
+        healthy = True
+        try:
+            yield client
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self.release(client, healthy)
+
+    def close(self):
+        while True:
+            try:
+                client, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(client)
+
+
+class LdapRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Serves newline-delimited JSON requests of the form {"argv": [...]} on one client socket
+    and answers each with {"response": ...}, or {"error": "..."} where the one-shot CLI would
+    log the error and exit.
+    """
+    def handle(self):
+        for line in self.rfile:
+            try:
+                action = json.loads(line)['argv']
+                with self.server.pool.connection() as client:
+                    reply = {'response': client.handle_action(action)}
+            except (ValueError, KeyError) as e:
+                logging.error(e)
+                reply = {'error': str(e)}
+            except OSError as e:
+                # No pooled connection could be acquired (TimeoutError) or bound (ConnectionError)
+                logging.error(e)
+                reply = {'error': str(e)}
+            except ldap.SERVER_DOWN as e:
+                # The connection is re-queued as unhealthy and checked before its next use
+                logging.error(f"==>> e: {e}")
+                reply = {'error': 'LDAP server unavailable'}
+            except Exception as e:
+                logging.error(f"==>> e: {e}")
+                reply = {'response': 'Check the Required Parameters for the Endpoint'}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class LdapDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, pool: LdapConnectionPool = None):
+        """
+        Long-running server that answers `ldap_script.py` actions over a local Unix socket
+        using a shared `LdapConnectionPool`, so clients skip connection setup and bind.
+
+        The socket is created with mode 0600, since requests run with the admin bind. A stale
+        socket file left by a daemon that exited uncleanly is replaced. The fallback directory
+        `PRIVATE_SOCKET_DIR` is created with mode 0700 and must belong to the current user.
+
+        Raises:
+            OSError: If another daemon is already listening on `socket_path`, or the private
+                socket directory belongs to another user or is accessible to others.
+        """
+        self.socket_path = socket_path
+        socket_dir = os.path.dirname(os.path.abspath(socket_path))
+        if socket_dir == os.path.abspath(PRIVATE_SOCKET_DIR):
+            os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+            dir_stat = os.lstat(socket_dir)
+            if not stat.S_ISDIR(dir_stat.st_mode) or dir_stat.st_uid != os.getuid() or dir_stat.st_mode & 0o077:
+                raise OSError(f'{socket_dir} must be a directory owned by the current user with mode 0700')
+        if os.path.exists(socket_path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(socket_path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    os.unlink(socket_path)
+                else:
+                    raise OSError(f'An LDAP daemon is already listening on {socket_path}')
+        self.pool = pool or LdapConnectionPool()
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, LdapRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def run_daemon(socket_path: str = DEFAULT_SOCKET_PATH):
+    try:
+        server = LdapDaemon(socket_path)
+    except OSError as e:
+        logging.error(e)
+        sys.exit(1)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'daemon':
+        run_daemon(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_SOCKET_PATH)
+        sys.exit(0)
     try:
         instantiate = LdapConnectivity()
         response = instantiate.main(sys.argv)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the script entry points, based on `python -X importtime`.
+
+Each entry point is imported in a fresh interpreter several times; the median cumulative import
+time of the entry module is compared with its budget. Heavy dependencies (jinja2, requests,
+mysql.connector, environ, python-ldap) are imported lazily, so they should not show up here.
+Exits with status 1 when an entry point is over budget, so it can run in CI or a git hook.
+
+Only short-lived scripts are listed; `automated_api_calls.py` runs as a loop, so its startup
+time does not matter and it keeps its dependencies as top-level imports.
+
+Usage:
+    python startup_benchmark.py                 # check every entry point
+    python startup_benchmark.py --details 10    # also list the 10 slowest imports per entry point
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# entry point: (directory added to sys.path, module name, budget in milliseconds)
+ENTRY_POINTS = {
+    'githubBackup.py': (ROOT, 'githubBackup', 40),
+    'ldap_client.py': (ROOT, 'ldap_client', 15),
+    'fileDiffViewer/diffViewer.py': (os.path.join(ROOT, 'fileDiffViewer'), 'diffViewer', 30),
+    'folderDiffViewer/folderDiffViewer.py': (os.path.join(ROOT, 'folderDiffViewer'), 'folderDiffViewer', 30),
+}
+
+
+def measure_import(path, module):
+    """
+    Imports `module` in a fresh interpreter with `-X importtime`.
+
+    Returns:
+        tuple: (cumulative import time of `module` in microseconds,
+            list of (self microseconds, imported module) for `module` and everything it imports)
+    """
+    code = f"import sys; sys.path.insert(0, {path!r}); import {module}"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=path)
+    if result.returncode != 0:
+        raise RuntimeError(f'Importing {module} failed:\n{result.stderr.strip()}')
+    cumulative = None
+    imports = []
+    subtree = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        subtree.append((int(self_us), name.strip()))
+        # Nested imports are reported before their parent, indented under it
+        if not name[1:].startswith(' '):
+            if name.strip() == module:
+                cumulative = int(cumulative_us)
+                imports = subtree
+            subtree = []
+    if cumulative is None:
+        raise RuntimeError(f'{module} not found in -X importtime output')
+    return cumulative, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check entry point import times against their budgets.')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per entry point; the median is used.')
+    parser.add_argument('--details', type=int, default=0, help='List the N slowest imports of each entry point.')
+    parser.add_argument('entry_points', nargs='*', default=list(ENTRY_POINTS), help='Entry points to check (default: all).')
+    args = parser.parse_args()
+
+    over_budget = []
+    print(f"{'entry point':<40} {'median ms':>10} {'budget ms':>10}")
+    for entry_point in args.entry_points:
+        path, module, budget_ms = ENTRY_POINTS[entry_point]
+        # The first import writes the .pyc files; do not count it
+        measure_import(path, module)
+        runs = [measure_import(path, module) for _ in range(args.runs)]
+        median_ms = statistics.median(cumulative for cumulative, _ in runs) / 1000
+        status = '' if median_ms <= budget_ms else '  OVER BUDGET'
+        print(f"{entry_point:<40} {median_ms:>10.1f} {budget_ms:>10}{status}")
+        if status:
+            over_budget.append(entry_point)
+        for self_us, name in sorted(runs[-1][1], reverse=True)[:args.details]:
+            print(f"    {self_us / 1000:>8.2f} ms  {name}")
+
+    if over_budget:
+        print(f"\nOver budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()